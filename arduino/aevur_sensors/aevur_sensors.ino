@@ -0,0 +1,95 @@
+// Aevur reference sketch: MQ-135 on A0, MQ-138 on A1.
+//
+// The host learns its sensors from sensors.json: keep SENSOR_NAMES below in
+// the same order as that file.
+//
+// Text protocol (default), one line per sample:
+//     MQ-135: 0.123 MQ-138: 0.045
+//
+// Binary protocol (BINARY_PROTOCOL 1), one frame per sample:
+//     0xA5 | header | values... | CRC-16 low, high
+// header bits 0-3 = sensor count, bit 7 set = uint16 ADC counts, clear =
+// float32 volts (both little-endian). The CRC is CRC-16/XMODEM over header
+// and values. The host (sensor_parser.py) detects either format on its own.
+//
+// For 10-100 Hz sampling lower SAMPLE_INTERVAL_MS and raise BAUDRATE, and
+// set the same BAUDRATE in sensor_engine.py.
+
+#include <util/crc16.h>
+
+#define BINARY_PROTOCOL 0
+#define SEND_ADC_COUNTS 1  // Binary payload: 1 = uint16 ADC counts, 0 = float32 volts
+
+const long BAUDRATE = 9600;
+const unsigned long SAMPLE_INTERVAL_MS = 1000;
+
+const uint8_t SENSOR_COUNT = 2;
+const uint8_t SENSOR_PINS[SENSOR_COUNT] = {A0, A1};
+const char *SENSOR_NAMES[SENSOR_COUNT] = {"MQ-135", "MQ-138"};
+
+const uint8_t SYNC = 0xA5;
+const uint8_t HEADER_ADC = 0x80;
+
+unsigned long lastSample = 0;
+
+float toVolts(uint16_t counts) {
+  return counts * 5.0 / 1023.0;
+}
+
+void sendText(const uint16_t *counts) {
+  for (uint8_t i = 0; i < SENSOR_COUNT; i++) {
+    if (i > 0) Serial.print(' ');
+    Serial.print(SENSOR_NAMES[i]);
+    Serial.print(": ");
+    Serial.print(toVolts(counts[i]), 3);
+  }
+  Serial.println();
+}
+
+void sendBinary(const uint16_t *counts) {
+  uint8_t frame[2 + SENSOR_COUNT * 4 + 2];
+  uint8_t length = 0;
+
+  frame[length++] = SYNC;
+  frame[length++] = SENSOR_COUNT | (SEND_ADC_COUNTS ? HEADER_ADC : 0);
+  for (uint8_t i = 0; i < SENSOR_COUNT; i++) {
+    if (SEND_ADC_COUNTS) {
+      frame[length++] = counts[i] & 0xFF;
+      frame[length++] = counts[i] >> 8;
+    } else {
+      float volts = toVolts(counts[i]);  // AVR floats are little-endian IEEE 754
+      memcpy(&frame[length], &volts, sizeof(volts));
+      length += sizeof(volts);
+    }
+  }
+
+  uint16_t crc = 0;
+  for (uint8_t i = 1; i < length; i++) {
+    crc = _crc_xmodem_update(crc, frame[i]);
+  }
+  frame[length++] = crc & 0xFF;
+  frame[length++] = crc >> 8;
+
+  Serial.write(frame, length);
+}
+
+void setup() {
+  Serial.begin(BAUDRATE);
+}
+
+void loop() {
+  unsigned long now = millis();
+  if (now - lastSample < SAMPLE_INTERVAL_MS) return;
+  lastSample = now;
+
+  uint16_t counts[SENSOR_COUNT];
+  for (uint8_t i = 0; i < SENSOR_COUNT; i++) {
+    counts[i] = analogRead(SENSOR_PINS[i]);
+  }
+
+  if (BINARY_PROTOCOL) {
+    sendBinary(counts);
+  } else {
+    sendText(counts);
+  }
+}
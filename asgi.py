@@ -0,0 +1,551 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from urllib.parse import parse_qs
+
+import sensor_engine
+import app as clinical
+import Userapp as user
+from assets import STATIC_PREFIX, assets
+from sensor_api import alert_limit, parse_duration, sensor_definitions
+from sensor_devices import select_sensors
+from sensor_export import export
+from sensor_stream import format_raw_event
+
+# asyncio serving mode: the same dashboards and routes as server.py, but
+# served by an ASGI server instead of Flask's thread-per-connection dev
+# server, so thousands of idle /stream subscribers cost a coroutine each.
+# Serial ingest runs on the event loop too (one reader callback per port).
+# Also serves /ws, a WebSocket carrying filtered updates and commands.
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+KEEPALIVE = 15  # Seconds between comment lines on an idle stream
+
+PAGES = {
+    "/": clinical.PAGE,
+    "/user": user.PAGE,
+    "/user/": user.PAGE,
+    # At the root so it may cache the pages too
+    "/sw.js": assets.service_worker(["/", "/user/"])
+}
+
+fanouts = {}  # Device name -> AsyncFanout
+_ingest = None
+
+
+class FanoutMessage:
+    # One published event, encoded lazily and at most once per format: as
+    # Server-Sent Event bytes, and as WebSocket text per sensor selection
+    __slots__ = ("event", "payload", "data", "_sse", "_texts")
+
+    def __init__(self, event, payload, data):
+        self.event = event
+        self.payload = payload
+        self.data = data
+        self._sse = None
+        self._texts = {}
+
+    @property
+    def sse(self):
+        if self._sse is None:
+            self._sse = format_raw_event(self.event, self.data)
+        return self._sse
+
+    def text(self, device, sensors=None):
+        # {"event", "device", "data"} WebSocket message; clients asking for
+        # the same sensors share one encoding
+        text = self._texts.get(sensors)
+        if text is None:
+            if sensors is None:
+                data = self.data
+            else:
+                data = json.dumps(select_sensors(self.payload, sensors, sensor_engine.schema),
+                                  separators=(',', ':')).encode('utf-8')
+            text = socket_message(self.event, device, data)
+            self._texts[sensors] = text
+        return text
+
+
+class AsyncFanout:
+    # Bridges one device's EventStream into the event loop. Messages land
+    # in a single shared ring; each subscriber only remembers how many
+    # messages it has seen and all of them wait on one shared future, so
+    # an idle connection needs no queue of its own. A subscriber that falls
+    # more than `backlog` messages behind skips the oldest, like EventStream.
+    def __init__(self, loop, events, backlog=16):
+        self.loop = loop
+        self.ring = deque(maxlen=backlog)
+        self.count = 0  # Messages received so far
+        self._wakeup = loop.create_future()
+        events.add_listener(self._publish_threadsafe)
+
+    def _publish_threadsafe(self, event, payload, data):
+        try:
+            self.loop.call_soon_threadsafe(self._publish, FanoutMessage(event, payload, data))
+        except RuntimeError:
+            pass  # Loop closed during shutdown
+
+    def _publish(self, message):
+        self.ring.append(message)
+        self.count += 1
+        wakeup, self._wakeup = self._wakeup, self.loop.create_future()
+        wakeup.set_result(None)
+
+    async def listen(self, position, timeout):
+        # Messages after `position` and the new position; nothing if no
+        # message arrives within `timeout` seconds
+        if position == self.count:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._wakeup), timeout)
+            except asyncio.TimeoutError:
+                return [], position
+        start = max(0, position - (self.count - len(self.ring)))
+        return list(itertools.islice(self.ring, start, None)), self.count
+
+
+async def ingest(devices):
+    # Read every port from the event loop: a reader callback per port with
+    # a file descriptor, a polling task for the rest (e.g. Windows COM ports)
+    loop = asyncio.get_running_loop()
+    polled = []
+
+    def on_readable(device):
+        if not devices.read(device) and not device.connected:
+            loop.remove_reader(device.port)
+
+    for device in devices.devices.values():
+        try:
+            loop.add_reader(device.port, on_readable, device)
+        except (ValueError, NotImplementedError):
+            polled.append(device)
+    try:
+        if not polled:
+            await asyncio.Future()  # Reader callbacks do all the work
+        while True:
+            idle = True
+            for device in polled:
+                if device.connected and devices.read(device):
+                    idle = False
+            await asyncio.sleep(devices.poll_interval if idle else 0)
+    finally:
+        for device in devices.devices.values():
+            if device not in polled:
+                loop.remove_reader(device.port)
+
+
+class Request:
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        query = parse_qs(scope["query_string"].decode('latin-1'))
+        self.args = {key: values[-1] for key, values in query.items()}
+        self.headers = {
+            key.decode('latin-1').lower(): value.decode('latin-1')
+            for key, value in scope["headers"]
+        }
+
+    def int_arg(self, name):
+        try:
+            return int(self.args[name])
+        except (KeyError, ValueError):
+            return None
+
+    def if_none_match(self):
+        # Strong and weak validators alike, unquoted
+        tags = self.headers.get("if-none-match", "")
+        return {tag.strip().removeprefix("W/").strip('"') for tag in tags.split(",")} - {""}
+
+    def accepts_gzip(self):
+        return "gzip" in self.headers.get("accept-encoding", "")
+
+    def device(self):
+        return sensor_engine.devices.get(self.args.get("device"))
+
+
+def json_response(payload, status=200):
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return status, body, {"Content-Type": "application/json"}
+
+
+def not_found(message="Not Found"):
+    return 404, message.encode('utf-8'), {"Content-Type": "text/plain"}
+
+
+async def send_response(send, status, body, headers, more_body=False):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(key.lower().encode('latin-1'), value.encode('latin-1'))
+                    for key, value in headers.items()]
+    })
+    await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+
+# Routes: (method, path) -> handler(request, device) returning
+# (status, body, headers); the same JSON as sensor_api
+ROUTES = {}
+
+
+def route(path, method="GET"):
+    def register(handler):
+        ROUTES[method, path] = handler
+        return handler
+    return register
+
+
+@route("/sensors")
+async def sensor_list(request, device):
+    return json_response(sensor_definitions())
+
+
+@route("/devices")
+async def device_list(request, device):
+    return json_response(sensor_engine.devices.summary())
+
+
+@route("/data")
+async def data(request, device):
+    snapshot = device.snapshot
+    since, accepts_gzip = request.int_arg("since"), request.accepts_gzip()
+    args = (since, request.if_none_match(), accepts_gzip)
+    if snapshot.costly(since, accepts_gzip):
+        # A long history is encoded on a worker thread, not the loop
+        return await asyncio.get_running_loop().run_in_executor(None, snapshot.respond, *args)
+    return snapshot.respond(*args)
+
+
+@route("/ingest_stats")
+async def ingest_stats(request, device):
+    return json_response(device.parser.stats())
+
+
+@route("/history")
+async def history(request, device):
+    # SQLite reads go to a worker thread so they never stall the loop
+    try:
+        span = parse_duration(request.args.get("range", "1h"))
+        end = float(request.args.get("end") or 0) or time.time()
+        resolution, points = await asyncio.get_running_loop().run_in_executor(
+            None, sensor_engine.store.history,
+            device.name, end - span, end, request.args.get("resolution", "auto")
+        )
+    except ValueError as e:
+        return json_response({"status": "error", "message": str(e)}, 400)
+    return json_response({
+        "device": device.name,
+        "resolution": resolution,
+        "start": end - span,
+        "end": end,
+        "points": points
+    })
+
+
+@route("/alerts")
+async def alerts(request, device):
+    events = await asyncio.get_running_loop().run_in_executor(
+        None, sensor_engine.store.alert_events,
+        device.name, request.int_arg("since") or 0, alert_limit(request.int_arg("limit"))
+    )
+    return json_response({"device": device.name, "events": events})
+
+
+@route("/reset_baseline", "POST")
+async def reset_baseline(request, device):
+    return json_response({"status": "accepted", "job": device.reset_baseline()}, 202)
+
+
+@route("/reset_baseline/status")
+async def reset_baseline_status(request, device):
+    return json_response(device.baseline_job.status())
+
+
+@route("/clear_history", "POST")
+async def clear_history(request, device):
+    device.clear_history()
+    return json_response({"status": "success", "message": "History cleared"})
+
+
+async def stream(request, device, receive, send):
+    # Server-Sent Events from the device's fanout until the client leaves
+    fanout = fanouts[device.name]
+    position = fanout.count  # Taken before the snapshot so nothing is missed
+    snapshot = device.snapshot
+    body = snapshot.body if not snapshot.costly() else \
+        await asyncio.get_running_loop().run_in_executor(None, snapshot.to_json)
+    await send_response(
+        send, 200,
+        b"retry: 3000\n\n" + format_raw_event("snapshot", body),
+        {"Content-Type": "text/event-stream", "Cache-Control": "no-cache",
+         "X-Accel-Buffering": "no"},
+        more_body=True
+    )
+
+    async def pump():
+        nonlocal position
+        while True:
+            messages, position = await fanout.listen(position, KEEPALIVE)
+            body = b"".join(message.sse for message in messages) or b": keepalive\n\n"
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+
+    async def disconnected():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    tasks = {asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()  # Surface errors from the pump
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def export_readings(request, device, receive, send):
+    # /export as in sensor_api: each chunk is read and encoded on a worker
+    # thread, so a month-long download never stalls ingest on the loop, and
+    # the next chunk is only made once the last one has been sent
+    try:
+        headers, chunks = export(sensor_engine.store, device.name, request.args)
+    except ValueError as e:
+        await send_response(send, *json_response({"status": "error", "message": str(e)}, 400))
+        return
+    loop = asyncio.get_running_loop()
+    gone = asyncio.Event()
+
+    async def disconnected():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        gone.set()
+
+    watcher = asyncio.ensure_future(disconnected())
+    try:
+        await send_response(send, 200, b"", headers, more_body=True)
+        while not gone.is_set():
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                break
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        watcher.cancel()
+        chunks.close()
+
+
+# Routes answered by writing to the connection themselves:
+# path -> handler(request, device, receive, send)
+STREAMS = {"/stream": stream, "/export": export_readings}
+
+
+def socket_message(event, device, data):
+    return '{"event":%s,"device":%s,"data":%s}' % (
+        json.dumps(event), json.dumps(device), data.decode('utf-8')
+    )
+
+
+class SocketClient:
+    # One /ws connection. The client picks devices, sensors and a
+    # decimation rate with a "subscribe" command and only gets those; it
+    # can pause and resume updates and run the control commands over the
+    # same socket. Commands are JSON objects:
+    #
+    #   {"type": "subscribe", "devices": [...], "sensors": [...], "every": 5}
+    #   {"type": "pause"} / {"type": "resume"} / {"type": "refresh"}
+    #   {"type": "reset_baseline", "device": ...}
+    #   {"type": "clear_history", "device": ...}
+    #
+    # Omitted devices/sensors mean the first board / every sensor; "every"
+    # forwards one reading in n. Each command may carry an "id", echoed in
+    # its "ack" or "error" reply. Updates reuse the /stream event names:
+    # {"event": "snapshot" | "reading" | "baseline" | "cleared", "device", "data"}.
+    def __init__(self, send):
+        self._send = send
+        self._send_lock = asyncio.Lock()
+        self.devices = []
+        self.sensors = None
+        self.every = 1
+        self.paused = False
+        self._pumps = []
+
+    async def emit(self, text):
+        async with self._send_lock:
+            await self._send({"type": "websocket.send", "text": text})
+
+    async def reply(self, event, request, **data):
+        if "id" in request:
+            data["id"] = request["id"]
+        await self.emit(json.dumps({"event": event, "data": data}, separators=(',', ':')))
+
+    async def emit_snapshot(self, device):
+        # Long histories are encoded on a worker thread, not the loop
+        snapshot = device.snapshot
+        loop = asyncio.get_running_loop()
+        if self.sensors is not None:
+            data = await loop.run_in_executor(None, snapshot.filtered, self.sensors,
+                                              sensor_engine.schema)
+        elif snapshot.costly():
+            data = await loop.run_in_executor(None, snapshot.to_json)
+        else:
+            data = snapshot.body
+        await self.emit(socket_message("snapshot", device.name, data))
+
+    async def pump(self, device):
+        fanout = fanouts[device.name]
+        position = fanout.count  # Taken before the snapshot so nothing is missed
+        await self.emit_snapshot(device)
+        unsent = 0
+        while True:
+            messages, position = await fanout.listen(position, None)
+            for message in messages:
+                if message.event == "alert" and self.sensors is not None and \
+                        message.payload["sensor"] not in self.sensors:
+                    continue
+                if message.event == "reading":
+                    if self.paused:
+                        continue
+                    unsent += 1
+                    if unsent < self.every:
+                        continue
+                    unsent = 0
+                await self.emit(message.text(device.name, self.sensors))
+
+    def device(self, command):
+        name = command.get("device")
+        if name is None and self.devices:
+            return self.devices[0]
+        device = sensor_engine.devices.get(name)
+        if device is None:
+            raise ValueError(f"unknown device {name!r}")
+        return device
+
+    async def handle(self, command):
+        kind = command.get("type")
+        if kind == "subscribe":
+            names = command.get("devices") or [None]
+            devices = [sensor_engine.devices.get(name) for name in names]
+            if None in devices:
+                raise ValueError("unknown device")
+            sensors = command.get("sensors")
+            if sensors is not None:
+                names = sensor_engine.schema.names
+                unknown = set(sensors) - set(names)
+                if unknown:
+                    raise ValueError(f"unknown sensors {sorted(unknown)}")
+                sensors = tuple(name for name in names if name in sensors)
+            every = int(command.get("every", 1))
+            if every < 1:
+                raise ValueError("every must be at least 1")
+            self.stop()
+            self.devices, self.sensors, self.every = devices, sensors, every
+            self._pumps = [asyncio.ensure_future(self.pump(device)) for device in devices]
+            return {"devices": [device.name for device in devices], "sensors": sensors,
+                    "every": every}
+        if kind == "pause":
+            self.paused = True
+        elif kind in ("resume", "refresh"):
+            # Readings skipped while paused are gone: start from a snapshot
+            self.paused = False
+            for device in self.devices:
+                await self.emit_snapshot(device)
+        elif kind == "reset_baseline":
+            return self.device(command).reset_baseline()
+        elif kind == "clear_history":
+            self.device(command).clear_history()
+        else:
+            raise ValueError(f"unknown command {kind!r}")
+        return None
+
+    def stop(self):
+        for task in self._pumps:
+            task.cancel()
+        self._pumps = []
+
+
+async def websocket(receive, send):
+    if (await receive())["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+    client = SocketClient(send)
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            command = {}
+            try:
+                parsed = json.loads(message.get("text") or message.get("bytes") or "")
+                if not isinstance(parsed, dict):
+                    raise ValueError("commands are JSON objects")
+                command = parsed
+                result = await client.handle(command)
+            except (ValueError, TypeError) as e:
+                await client.reply("error", command, message=str(e))
+            else:
+                await client.reply("ack", command, command=command.get("type"), result=result)
+    finally:
+        client.stop()
+
+
+async def lifespan(receive, send):
+    global _ingest
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Opening ports sleeps for the Arduino reset; keep the loop free
+            loop = asyncio.get_running_loop()
+            devices = await loop.run_in_executor(None, sensor_engine.start, False)
+            for name, device in devices.devices.items():
+                fanouts[name] = AsyncFanout(loop, device.events)
+            _ingest = asyncio.ensure_future(ingest(devices))
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _ingest is not None:
+                _ingest.cancel()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] == "websocket":
+        if scope["path"] == "/ws":
+            await websocket(receive, send)
+        else:
+            await send({"type": "websocket.close"})
+        return
+    if scope["type"] != "http":
+        return
+    request = Request(scope)
+    if request.method == "GET" and (request.path in PAGES or request.path.startswith(STATIC_PREFIX)):
+        # Pages and static files, prepared at startup
+        asset = PAGES.get(request.path) or assets.get(request.path)
+        if asset is None:
+            await send_response(send, *not_found())
+        else:
+            await send_response(send, *asset.respond(request.if_none_match(),
+                                                      request.accepts_gzip()))
+        return
+
+    handler = ROUTES.get((request.method, request.path))
+    streamer = STREAMS.get(request.path) if request.method == "GET" else None
+    if handler is None and streamer is None:
+        await send_response(send, *not_found())
+        return
+    device = request.device()
+    if device is None:
+        await send_response(send, *not_found("Unknown device"))
+    elif streamer is not None:
+        await streamer(request, device, receive, send)
+    else:
+        await send_response(send, *await handler(request, device))
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -0,0 +1,222 @@
+import copy
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+
+import jinja2
+from markupsafe import Markup
+
+# Static files for the dashboards, loaded into memory once at startup.
+# Every file under static/ is served from a fingerprinted URL
+# (/static/app.3f2a9c1e0b.js) that changes whenever its content does, so
+# browsers may cache it for a year; pages are rendered once with those
+# URLs and revalidated by ETag. Bodies are gzipped ahead of time, so a
+# request is a dictionary lookup and a memory copy. Files are also served
+# from their plain path (/static/app.js, revalidated every time) for
+# references that can't be fingerprinted, like fonts named in a stylesheet.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_PREFIX = "/static/"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Third-party files the pages use, downloaded into static/ by vendor.py so
+# the dashboards work on a LAN without internet access. Until they are,
+# pages point at these original URLs instead.
+VENDORED = {
+    "vendor/chart.min.js": "https://cdnjs.cloudflare.com/ajax/libs/Chart.js/3.9.1/chart.min.js",
+    "vendor/prompt/prompt.css":
+        "https://fonts.googleapis.com/css2?family=Prompt:wght@200;400;500;700&display=swap",
+    "vendor/img/aevur.png": "https://i.postimg.cc/vBdW4fTx/Pitch-for-change-Aevur.png",
+    "vendor/img/mq135.png":
+        "https://bz49dmux6d.ufs.sh/f/1Q7cAF0oN6JTml6DJ2HxG6E3TILBoXrtsVONDbQPY0Kinl1F",
+    "vendor/img/mq138.png":
+        "https://bz49dmux6d.ufs.sh/f/1Q7cAF0oN6JTLqYK7j5kX0SfouG3gHjNi7P1CsqceVOvn68A"
+}
+
+# Rendered with the fingerprinted URLs, so any change to a static file
+# installs a new worker that drops the old cache
+SERVICE_WORKER_TEMPLATE = """
+// Service worker (rendered by assets.py). Fingerprinted static files never
+// change, so they come from the cache; pages and other static paths go to
+// the network first and fall back to their cached copy when the server
+// can't be reached. API calls and streams are never cached. Vendored
+// files not bundled yet are cached from the internet when first loaded.
+const CACHE = 'aevur-{{ version }}';
+const FILES = {{ files | tojson }};
+const PAGES = {{ pages | tojson }};
+const REMOTE = {{ remote | tojson }};
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE)
+            .then(cache => cache.addAll(FILES.concat(PAGES)))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(key => key !== CACHE).map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET') return;
+    if (REMOTE.includes(request.url)) {
+        event.respondWith(
+            caches.match(request).then(cached => cached || fetch(request).then(response => {
+                const copy = response.clone();
+                caches.open(CACHE).then(cache => cache.put(request, copy));
+                return response;
+            }))
+        );
+        return;
+    }
+    if (url.origin !== location.origin) return;
+    if (FILES.includes(url.pathname)) {
+        event.respondWith(caches.match(request).then(cached => cached || fetch(request)));
+    } else if (PAGES.includes(url.pathname) || url.pathname.startsWith('/static/')) {
+        event.respondWith(
+            fetch(request)
+                .then(response => {
+                    if (response.ok) {
+                        const copy = response.clone();
+                        caches.open(CACHE).then(cache => cache.put(url.pathname, copy));
+                    }
+                    return response;
+                })
+                .catch(() => caches.match(url.pathname))
+        );
+    }
+});
+"""
+
+mimetypes.add_type("font/woff2", ".woff2")
+
+
+class Asset:
+    # One response body ready to send, with its gzip copy when that helps
+    __slots__ = ("body", "gzip_body", "etag", "content_type", "cache_control")
+
+    def __init__(self, body, content_type, cache_control, gzip_min_size=512):
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
+        self.gzip_body = None
+        if len(body) >= gzip_min_size:
+            compressed = gzip.compress(body, 9)
+            if len(compressed) < len(body):
+                self.gzip_body = compressed
+
+    def revalidated(self):
+        # The same body under a URL that isn't fingerprinted
+        asset = copy.copy(self)
+        asset.cache_control = "no-cache"
+        return asset
+
+    def respond(self, if_none_match, accepts_gzip):
+        # (status, body, headers) for any server, like Snapshot.respond
+        etag, gzip_etag = self.etag, self.etag + "-gz"
+        headers = {"Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if etag in if_none_match or gzip_etag in if_none_match:
+            headers["ETag"] = f'"{etag}"'
+            return 304, b"", headers
+        body = self.body
+        if self.gzip_body is not None and accepts_gzip:
+            body, etag = self.gzip_body, gzip_etag
+            headers["Content-Encoding"] = "gzip"
+        headers["ETag"] = f'"{etag}"'
+        headers["Content-Type"] = self.content_type
+        return 200, body, headers
+
+
+class AssetStore:
+    # Fingerprinted static files plus the pages rendered against them
+    def __init__(self, directory):
+        self.urls = {}  # "app.js" -> "/static/app.3f2a9c1e0b.js"
+        self.files = {}  # Fingerprinted or plain URL -> Asset
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                with open(path, 'rb') as f:
+                    body = f.read()
+                relative = os.path.relpath(path, directory).replace(os.sep, "/")
+                stem, ext = os.path.splitext(relative)
+                digest = hashlib.sha256(body).hexdigest()[:10]
+                url = f"{STATIC_PREFIX}{stem}.{digest}{ext}"
+                content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                if content_type.startswith("text/") or content_type == "application/javascript":
+                    content_type += "; charset=utf-8"
+                self.urls[relative] = url
+                self.files[url] = asset = Asset(body, content_type, IMMUTABLE)
+                self.files[STATIC_PREFIX + relative] = asset.revalidated()
+
+        missing = [name for name in VENDORED if name not in self.urls]
+        if missing:
+            logging.getLogger(__name__).warning(
+                "%d vendored file(s) missing, loading them from the internet; "
+                "run vendor.py to bundle them", len(missing)
+            )
+
+        self._workers = {}  # Page paths -> service worker Asset
+
+    def url(self, name):
+        # URL of a static file, or a full URL unchanged. A vendored file
+        # that hasn't been downloaded yet gives its original location.
+        if name in self.urls:
+            return self.urls[name]
+        if "://" in name:
+            return name
+        return VENDORED[name]
+
+    def get(self, path):
+        # Asset for a request path, or None
+        return self.files.get(path)
+
+    def service_worker(self, pages):
+        # /sw.js for a server whose pages are at `pages`. Only pages the
+        # server really has may be listed: one failed precache request and
+        # the worker never installs.
+        pages = tuple(pages)
+        worker = self._workers.get(pages)
+        if worker is None:
+            files = sorted(self.urls.values())
+            remote = sorted(VENDORED[name] for name in VENDORED if name not in self.urls)
+            version = hashlib.sha256("".join(files + list(pages) + remote).encode()).hexdigest()[:10]
+            text = jinja2.Template(SERVICE_WORKER_TEMPLATE).render(
+                version=version, files=files, pages=list(pages), remote=remote
+            )
+            worker = Asset(text.encode('utf-8'), "text/javascript; charset=utf-8", "no-cache")
+            self._workers[pages] = worker
+        return worker
+
+    def stylesheet(self, name):
+        # <link> for a stylesheet. One still on the internet is loaded
+        # without blocking the first paint, so an unreachable font server
+        # only costs the font.
+        url = self.url(name)
+        if name in self.urls:
+            return Markup('<link rel="stylesheet" href="%s">') % url
+        return Markup(
+            '<link rel="stylesheet" href="%s" media="print" onload="this.media=\'all\'">'
+            '<noscript><link rel="stylesheet" href="%s"></noscript>'
+        ) % (url, url)
+
+    def page(self, template):
+        # Renders a page template once; {{ static('app.js') }} gives a
+        # file's current URL and {{ stylesheet('app.css') }} its <link>.
+        # Pages keep their own URL, so clients revalidate them (a 304
+        # while nothing changed).
+        html = jinja2.Template(template).render(static=self.url, stylesheet=self.stylesheet)
+        return Asset(html.encode('utf-8'), "text/html; charset=utf-8", "no-cache")
+
+
+assets = AssetStore(STATIC_DIR)
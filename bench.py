@@ -0,0 +1,352 @@
+import argparse
+import gzip
+import http.client
+import json
+import logging
+import math
+import multiprocessing
+import os
+import pty
+import random
+import resource
+import tempfile
+import threading
+import time
+import tty
+
+import sensor_engine
+from sensor_parser import Reading
+from sensor_schema import SensorSchema
+
+# Benchmark of the whole pipeline without an Arduino: each simulated board
+# is a pseudo-terminal fed with text frames ("MQ-135: 0.512 MQ-138: 0.031")
+# at a fixed rate, read by the real serial ingest (parser, baseline,
+# detectors, alerts, store, snapshots), while client processes load-test
+# /data and time readings over /stream. Linux/macOS only (pty).
+#
+#   python bench.py --rate 100 --devices 2 --clients 50 --duration 30
+#   python bench.py --server asgi --clients 500
+#   python bench.py --replay capture.txt   # lines as logged from a real board
+#
+# Reports samples/sec parsed and published, sensor-to-client latency
+# percentiles (from the moment a board writes a frame to its port, so time
+# spent queued in the port counts, to the moment a /stream client has
+# parsed it), /data throughput and latency, and the CPU and memory of the
+# server process.
+
+
+class FakeBoard:
+    # A pseudo-terminal standing in for one board's serial port; a thread
+    # writes the frames due so far every `tick` seconds
+    def __init__(self, schema, rate, lines=None, tick=0.01, spike_every=20.0):
+        self.master, slave = pty.openpty()
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self._slave = slave  # Held open so the port stays up between reads
+        self.schema = schema
+        self.rate = rate
+        self.lines = lines
+        self.tick = tick
+        self.spike_every = spike_every
+        self.written = 0
+        self.sent = []  # Wall-clock write time of every frame, by index
+        self._values = None
+        self._stop = threading.Event()
+
+    def frame(self, index, now):
+        # Line `index` of the board's output
+        if self.lines:
+            return self.lines[index % len(self.lines)]
+        # Slow random walk around the baseline, with a gas spike every
+        # `spike_every` seconds so the detectors and alerts have work to do
+        if self._values is None:
+            self._values = [random.uniform(0.3, 0.6) for _ in self.schema.names]
+        spike = self.spike_every and now % self.spike_every < 2.0
+        fields = []
+        for i, name in enumerate(self.schema.names):
+            self._values[i] = max(0.0, self._values[i] + random.gauss(0, 0.002))
+            value = self._values[i] + (self.schema.thresholds[i] * 3 if spike else 0)
+            fields.append(f"{name}: {value:.3f}")
+        return " ".join(fields) + "\n"
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        started = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            due = int((now - started) * self.rate) - self.written
+            if due > 0:
+                sent = time.time()
+                text = "".join(self.frame(self.written + k, sent) for k in range(due))
+                self.sent.extend([sent] * due)  # Before the server can read them
+                os.write(self.master, text.encode())  # Blocks if the reader falls behind
+                self.written += due
+            self._stop.wait(self.tick)
+
+
+def stamp_frames(device, board):
+    # Readings of `device` get the time `board` wrote their frame instead of
+    # the time the server read it, so the latency /stream clients measure
+    # from the sample timestamp includes time queued in the port. Every
+    # line the board writes is one frame, malformed or not, so the parser's
+    # frame count indexes board.sent.
+    parser, read_from = device.parser, device.parser.read_from
+
+    def read(port):
+        readings = read_from(port)
+        end = parser.frames
+        return [Reading(board.sent[index], reading.values)
+                for index, reading in zip(range(end - len(readings), end), readings)]
+
+    parser.read_from = read
+
+
+def percentiles(values, points=(50, 90, 99)):
+    values = sorted(values)
+    if not values:
+        return {}
+    result = {f"p{p}": values[min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1)]
+              for p in points}
+    result["max"] = values[-1]
+    return result
+
+
+def new_results():
+    return {"latency": [], "stream": [], "bytes": 0, "errors": 0}
+
+
+def poll_data(port, device, interval, deadline, results):
+    # One dashboard polling /data like the page's fallback does: a full
+    # response first, then deltas after the newest seq it has
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    since, etag = None, None
+    while time.time() < deadline:
+        path = f"/data?device={device}" + (f"&since={since}" if since is not None else "")
+        headers = {"Accept-Encoding": "gzip"}
+        if etag:
+            headers["If-None-Match"] = etag
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            results["errors"] += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            time.sleep(interval)
+            continue
+        results["latency"].append(time.perf_counter() - started)
+        results["bytes"] += len(body)
+        if response.status == 200:
+            etag = response.getheader("ETag")
+            if response.getheader("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            since = json.loads(body)["seq"]
+        elif response.status != 304:
+            results["errors"] += 1
+        time.sleep(interval)
+
+
+def watch_stream(port, device, deadline, results):
+    # Sensor-to-client latency of every "reading" event on /stream
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", f"/stream?device={device}")
+    response = conn.getresponse()
+    event = None
+    while time.time() < deadline:
+        try:
+            line = response.readline()
+        except OSError:
+            break
+        if not line:
+            break
+        line = line.strip()
+        if line.startswith(b"event:"):
+            event = line[6:].strip()
+        elif line.startswith(b"data:") and event == b"reading":
+            sample = json.loads(line[5:])["sample"]
+            results["stream"].append(time.time() - sample["timestamp"])  # Board write time
+    conn.close()
+
+
+def run_clients(port, devices, clients, interval, begin, deadline, queue):
+    # Client process: `clients` pollers spread over the devices, plus one
+    # /stream watcher per device, all running from `begin` to `deadline`
+    jobs = [(poll_data, (port, devices[i % len(devices)], interval, deadline))
+            for i in range(clients)]
+    jobs += [(watch_stream, (port, device, deadline)) for device in devices]
+    results = [new_results() for _ in jobs]
+    threads = [threading.Thread(target=target, args=args + (result,), daemon=True)
+               for (target, args), result in zip(jobs, results)]
+    time.sleep(max(0.0, begin - time.time()))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.time()) + 15)
+    merged = new_results()
+    for result in results:
+        for key, value in result.items():
+            merged[key] += value
+    queue.put(merged)
+
+
+def serve(kind, port):
+    # Runs the chosen server on a background thread of this process
+    if kind == "asgi":
+        import uvicorn
+        import asgi
+        server = uvicorn.Server(uvicorn.Config(asgi.app, host="127.0.0.1", port=port,
+                                               log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+    else:
+        from werkzeug.serving import make_server
+        import server
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)  # No line per request
+        httpd = make_server("127.0.0.1", port, server.app, threaded=True)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+
+def usage():
+    # (CPU seconds, current RSS bytes, peak RSS bytes) of this process
+    times = os.times()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak *= 1 if os.uname().sysname == "Darwin" else 1024
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        rss = peak
+    return times.user + times.system, rss, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest and the HTTP API "
+                                                 "against simulated sensor boards")
+    parser.add_argument("--rate", type=float, default=50, help="samples/sec per board")
+    parser.add_argument("--devices", type=int, default=1, help="simulated boards")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent /data pollers")
+    parser.add_argument("--client-processes", type=int, default=2)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between polls")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds")
+    parser.add_argument("--server", choices=("flask", "asgi"), default="flask")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--replay", help="file of text frames to loop instead of generated ones")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    lines = None
+    if args.replay:
+        with open(args.replay) as f:
+            lines = [line.strip() + "\n" for line in f if line.strip()]
+
+    schema = SensorSchema.load(sensor_engine.SENSORS_FILE)
+    boards = {f"bench{i}": FakeBoard(schema, args.rate, lines) for i in range(args.devices)}
+    workdir = tempfile.mkdtemp(prefix="aevur-bench-")
+    sensor_engine.SERIAL_PORTS = {name: board.port for name, board in boards.items()}
+    sensor_engine.DB_PATH = os.path.join(workdir, "bench.db")
+    serve(args.server, args.port)
+    registry = sensor_engine.start()
+    # Boards only start writing once their port is open, since opening it
+    # flushes anything already buffered and the frame count would drift
+    # from board.sent
+    for name, board in boards.items():
+        stamp_frames(registry.devices[name], board)
+        board.start()
+    time.sleep(2)  # Startup calibration and first snapshots
+
+    # Clients start together once every process is up; the server's
+    # counters are read at the same two moments
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    begin = time.time() + 3
+    deadline = begin + args.duration
+    processes = []
+    for i in range(args.client_processes):
+        clients = args.clients // args.client_processes + (i < args.clients % args.client_processes)
+        processes.append(context.Process(
+            target=run_clients,
+            args=(args.port, list(boards), clients, args.interval, begin, deadline, queue)
+        ))
+    for process in processes:
+        process.start()
+
+    def counters():
+        devices = registry.devices.values()
+        return (sum(board.written for board in boards.values()),
+                sum(device.parser.frames for device in devices),
+                sum(device.reading_seq for device in devices),
+                usage()[0])
+
+    time.sleep(max(0.0, begin - time.time()))
+    before = counters()
+    time.sleep(max(0.0, deadline - time.time()))
+    written, parsed, published, cpu = (b - a for a, b in zip(before, counters()))
+    _, rss, peak = usage()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    for board in boards.values():
+        board.stop()
+
+    elapsed = args.duration
+    latency = [value for result in results for value in result["latency"]]
+    stream = [value for result in results for value in result["stream"]]
+    report = {
+        "server": args.server,
+        "devices": args.devices,
+        "clients": args.clients,
+        "seconds": elapsed,
+        "ingest": {
+            "written_per_sec": written / elapsed,
+            "parsed_per_sec": parsed / elapsed,
+            "published_per_sec": published / elapsed,
+            "malformed": sum(device.parser.malformed for device in registry.devices.values())
+        },
+        "stream_latency_ms": {key: value * 1000 for key, value in percentiles(stream).items()},
+        "stream_events": len(stream),
+        "data": {
+            "requests_per_sec": len(latency) / elapsed,
+            "latency_ms": {key: value * 1000 for key, value in percentiles(latency).items()},
+            "kb_per_sec": sum(result["bytes"] for result in results) / elapsed / 1024,
+            "errors": sum(result["errors"] for result in results)
+        },
+        # Server process only; the clients run in their own processes
+        "cpu_percent": cpu / elapsed * 100,
+        "rss_mb": rss / 2 ** 20,
+        "peak_rss_mb": peak / 2 ** 20
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+def print_report(report):
+    ingest, data = report["ingest"], report["data"]
+
+    def ms(stats):
+        return " ".join(f"{key} {value:.1f}" for key, value in stats.items()) or "n/a"
+
+    print(f"{report['server']} server, {report['devices']} board(s), "
+          f"{report['clients']} /data clients, {report['seconds']} s")
+    print(f"ingest     written {ingest['written_per_sec']:.1f}/s  "
+          f"parsed {ingest['parsed_per_sec']:.1f}/s  "
+          f"published {ingest['published_per_sec']:.1f}/s  malformed {ingest['malformed']}")
+    print(f"/stream    {report['stream_events']} readings, latency ms: "
+          f"{ms(report['stream_latency_ms'])}")
+    print(f"/data      {data['requests_per_sec']:.1f} req/s  {data['kb_per_sec']:.1f} KiB/s  "
+          f"errors {data['errors']}  latency ms: {ms(data['latency_ms'])}")
+    print(f"server     cpu {report['cpu_percent']:.0f}%  rss {report['rss_mb']:.1f} MiB  "
+          f"peak {report['peak_rss_mb']:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
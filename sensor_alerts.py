@@ -0,0 +1,93 @@
+import numpy as np
+
+CLEAR, PENDING, ACTIVE, CLEARING = range(4)
+
+
+class AlertTracker:
+    # Debounces the raw detector flags of one device into alerts, one state
+    # machine per sensor:
+    #
+    #   clear -> pending   a detector fires
+    #   pending -> active  detectors kept firing for `min_duration` seconds
+    #   active -> clearing no detector fires and the reading is back under
+    #                      `exit_ratio` thresholds above baseline
+    #   clearing -> clear  ...and stayed there for `clear_after` seconds
+    #
+    # so a single noisy reading never raises an alert and a reading hovering
+    # around the threshold doesn't toggle it. update() returns the
+    # transitions (alert started / ended) for the event log.
+    def __init__(self, sensors, min_duration=1.0, clear_after=3.0, exit_ratio=0.5):
+        self.sensors = list(sensors)
+        self.min_duration = min_duration
+        self.clear_after = clear_after
+        self.exit_ratio = exit_ratio
+        count = len(self.sensors)
+        self.states = [CLEAR] * count
+        self._since = [None] * count  # When the current state began
+        self._start = [None] * count  # When the current alert began
+        self._peak = [None] * count
+        self._detectors = [[] for _ in range(count)]
+
+    def active(self, i):
+        return self.states[i] in (ACTIVE, CLEARING)
+
+    def update(self, timestamps, values, flags, baseline, thresholds):
+        # `flags` is {detector: (rows, sensors) bool}. Returns the (rows,
+        # sensors) alert state and [(row, event)] transitions, where event is
+        # {"sensor", "state": "active" | "cleared", "start", "end", "peak",
+        # "detectors"}.
+        values = np.asarray(values, dtype=float)
+        fired = sum(flags.values()) > 0
+        quiet = ~fired & (values - np.asarray(baseline) < self.exit_ratio * np.asarray(thresholds))
+        alerting = np.empty(values.shape, dtype=bool)
+        transitions = []
+        for i in range(len(self.sensors)):
+            state = self.states[i]
+            if (state == CLEAR and not fired[:, i].any()) or \
+                    (state == ACTIVE and not quiet[:, i].any()):
+                alerting[:, i] = state == ACTIVE  # Nothing can change
+                if state == ACTIVE:
+                    self._peak[i] = max(self._peak[i], values[:, i].max())
+                continue
+            for row, now in enumerate(timestamps):
+                state = self._step(i, row, now, values[row, i], fired[row, i],
+                                   quiet[row, i], flags, transitions)
+                alerting[row, i] = state in (ACTIVE, CLEARING)
+        transitions.sort(key=lambda transition: transition[0])
+        return alerting, transitions
+
+    def _step(self, i, row, now, value, fired, quiet, flags, transitions):
+        state = self.states[i]
+        if state == CLEAR:
+            if fired:
+                state, self._since[i], self._peak[i] = PENDING, now, value
+        elif state == PENDING:
+            if not fired:
+                state = CLEAR
+            else:
+                self._peak[i] = max(self._peak[i], value)
+                if now - self._since[i] >= self.min_duration:
+                    state, self._start[i] = ACTIVE, self._since[i]
+                    self._detectors[i] = [name for name, rows in flags.items() if rows[row, i]]
+                    transitions.append((row, self._event(i, "active", None)))
+        else:
+            self._peak[i] = max(self._peak[i], value)
+            if state == ACTIVE and quiet:
+                state, self._since[i] = CLEARING, now
+            elif state == CLEARING and not quiet:
+                state = ACTIVE
+            elif state == CLEARING and now - self._since[i] >= self.clear_after:
+                state = CLEAR
+                transitions.append((row, self._event(i, "cleared", self._since[i])))
+        self.states[i] = state
+        return state
+
+    def _event(self, i, state, end):
+        return {
+            "sensor": self.sensors[i],
+            "state": state,
+            "start": self._start[i],
+            "end": end,
+            "peak": float(self._peak[i]),
+            "detectors": self._detectors[i]
+        }
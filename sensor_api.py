@@ -0,0 +1,186 @@
+import time
+
+from flask import Flask, Blueprint, Response, abort, current_app, jsonify, request
+
+import sensor_engine
+from assets import STATIC_PREFIX, assets
+from sensor_export import export
+from sensor_stream import format_raw_event
+
+# JSON/SSE routes shared by every dashboard view
+api = Blueprint("api", __name__)
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+MAX_ALERT_EVENTS = 5000  # Per /alerts response
+
+
+def create_app(*views):
+    # One Flask app serving the sensor API plus the given dashboard
+    # blueprints, all backed by the single sensor_engine pipeline
+    app = Flask(__name__, static_folder=None)  # static/ is served by `assets`
+    app.register_blueprint(api)
+    for view, prefix in views:
+        app.register_blueprint(view, url_prefix=prefix)
+    # Each view's page is its "/" route; the service worker precaches them
+    app.config["PAGE_PATHS"] = [prefix.rstrip("/") + "/" for _, prefix in views]
+    sensor_engine.start()
+    return app
+
+
+def parse_duration(text):
+    # "90", "15m", "24h", "7d" -> seconds
+    if text[-1:] in DURATION_UNITS:
+        return float(text[:-1]) * DURATION_UNITS[text[-1]]
+    return float(text)
+
+
+def alert_limit(limit):
+    # /alerts ?limit=: 500 when unset, always within 1..MAX_ALERT_EVENTS
+    # (SQLite would read LIMIT -1 as no limit at all)
+    if limit is None:
+        return 500
+    return max(1, min(limit, MAX_ALERT_EVENTS))
+
+
+def send_asset(asset):
+    # A page or static file rendered at startup, gzipped when accepted
+    status, body, headers = asset.respond(
+        request.if_none_match.as_set(), "gzip" in request.accept_encodings
+    )
+    return Response(body, status=status, headers=headers)
+
+
+def sensor_definitions():
+    # The sensor schema, with each picture as a URL the pages can load, and
+    # how many readings the chart keeps
+    definitions = sensor_engine.schema.to_json()
+    for sensor in definitions["sensors"]:
+        if sensor["image"]:
+            sensor["image"] = assets.url(sensor["image"])
+    definitions["history_length"] = sensor_engine.HISTORY_LENGTH  # Chart window
+    return definitions
+
+
+def get_device():
+    # Every sensor route takes ?device=<name>; the first board by default
+    device = sensor_engine.devices.get(request.args.get("device"))
+    if device is None:
+        abort(404, description="Unknown device")
+    return device
+
+
+@api.route(STATIC_PREFIX + "<path:name>")
+def static_file(name):
+    asset = assets.get(STATIC_PREFIX + name)
+    if asset is None:
+        abort(404)
+    return send_asset(asset)
+
+
+@api.route("/sw.js")
+def service_worker():
+    # Served from the root so it may cache the pages too
+    return send_asset(assets.service_worker(current_app.config["PAGE_PATHS"]))
+
+
+@api.route("/sensors")
+def sensor_list():
+    # Sensor definitions the dashboards build their cards and chart from
+    return jsonify(sensor_definitions())
+
+
+@api.route("/devices")
+def device_list():
+    return jsonify(sensor_engine.devices.summary())
+
+
+@api.route("/data")
+def data():
+    # One consistent snapshot, serialized (and gzipped) by the ingest thread.
+    # A client already holding this snapshot gets an empty 304.
+    snapshot = get_device().snapshot
+    status, body, headers = snapshot.respond(
+        request.args.get("since", type=int),
+        request.if_none_match.as_set(),
+        "gzip" in request.accept_encodings
+    )
+    return Response(body, status=status, headers=headers)
+
+
+@api.route("/stream")
+def stream():
+    device = get_device()
+    initial = format_raw_event("snapshot", device.snapshot.body)
+    return Response(
+        device.events.listen(initial=initial),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@api.route("/ingest_stats")
+def ingest_stats():
+    return jsonify(get_device().parser.stats())
+
+
+@api.route("/history")
+def history():
+    # Long-range chart data from the on-disk store, e.g. ?range=7d picks the
+    # 15-minute min/max/mean tier; ?resolution=raw|1s|1m|15m forces a tier
+    device = get_device()
+    try:
+        span = parse_duration(request.args.get("range", "1h"))
+        end = float(request.args.get("end") or 0) or time.time()
+        resolution, points = sensor_engine.store.history(
+            device.name, end - span, end, request.args.get("resolution", "auto")
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({
+        "device": device.name,
+        "resolution": resolution,
+        "start": end - span,
+        "end": end,
+        "points": points
+    })
+
+
+@api.route("/export")
+def export_readings():
+    # Stored readings as a download, e.g. ?from=2024-05-01&to=2024-06-01&
+    # format=csv|ndjson|parquet, streamed a chunk of rows at a time
+    device = get_device()
+    try:
+        headers, chunks = export(sensor_engine.store, device.name, request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return Response(chunks, headers=headers)
+
+
+@api.route("/alerts")
+def alerts():
+    # Alert log: every alert start and end after event id ?since=
+    device = get_device()
+    events = sensor_engine.store.alert_events(
+        device.name, request.args.get("since", 0, type=int),
+        alert_limit(request.args.get("limit", type=int))
+    )
+    return jsonify({"device": device.name, "events": events})
+
+
+@api.route("/reset_baseline", methods=['POST'])
+def reset_baseline():
+    # Starts a background recalibration and returns straight away
+    job = get_device().reset_baseline()
+    return jsonify({"status": "accepted", "job": job}), 202
+
+
+@api.route("/reset_baseline/status")
+def reset_baseline_status():
+    return jsonify(get_device().baseline_job.status())
+
+
+@api.route("/clear_history", methods=['POST'])
+def clear_history():
+    get_device().clear_history()
+    return jsonify({"status": "success", "message": "History cleared"})
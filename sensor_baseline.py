@@ -0,0 +1,118 @@
+import itertools
+import threading
+import time
+
+import numpy as np
+
+_job_ids = itertools.count(1)
+
+
+class BaselineJob:
+    # Recalibration that averages the next `samples` readings the device
+    # ingest passes to Device.process, so the serial port is only ever read
+    # by the ingest loop and request handlers never wait on the sensor.
+    def __init__(self, samples=5):
+        self.id = next(_job_ids)
+        self.samples = samples
+        self.started = time.time()
+        self.finished = None
+        self.baseline = None
+        self._sums = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def add(self, values):
+        # Feed one reading; returns True when this reading completed the job
+        with self._lock:
+            if self.done:
+                return False
+            if self._sums is None:
+                self._sums = [0.0] * len(values)
+            for i, value in enumerate(values):
+                self._sums[i] += value
+            self._count += 1
+            if self._count < self.samples:
+                return False
+            self.baseline = [total / self._count for total in self._sums]
+            self.finished = time.time()
+            return True
+
+    def status(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "state": "done" if self.done else "running",
+                "collected": self._count,
+                "samples": self.samples,
+                "started": self.started,
+                "finished": self.finished,
+                "baseline": self.baseline
+            }
+
+
+class DriftingBaseline:
+    # Online baseline following slow sensor drift (temperature, humidity,
+    # warm-up). Brown's double exponential smoothing: `level` is an EWMA of
+    # the readings, `smooth` an EWMA of the level, and 2 * level - smooth
+    # follows a steady drift without lagging behind it (a plain EWMA trails
+    # a ramp by rate * time_constant, which can exceed a sensor's threshold
+    # and keep an alert up for good). `time_constant` is in seconds, so it
+    # adapts at the same pace whatever the sample rate. Readings taken
+    # during a gas event are left out, so it never becomes the new normal;
+    # but for at most `max_exclusion` seconds in a row, so an alert raised
+    # by drift itself can't freeze the baseline.
+    def __init__(self, sensor_count, time_constant=1800.0, max_exclusion=900.0):
+        self.time_constant = time_constant
+        self.max_exclusion = max_exclusion
+        self.level = np.zeros(sensor_count)
+        self.smooth = np.zeros(sensor_count)
+        self.updated = None  # Timestamp of the newest reading folded in
+        self._excluded_since = np.full(sensor_count, np.nan)  # Per sensor, NaN if not excluded
+
+    @property
+    def value(self):
+        return 2 * self.level - self.smooth
+
+    def reset(self, baseline, timestamp=None):
+        self.level = np.array(baseline, dtype=float)
+        self.smooth = self.level.copy()
+        self.updated = timestamp
+        self._excluded_since[:] = np.nan
+
+    def _limit(self, timestamps, excluded):
+        # `excluded` without the rows of exclusions older than max_exclusion
+        times = np.asarray(timestamps, dtype=float)
+        rows = np.arange(len(excluded))[:, None]
+        before = np.vstack([~np.isnan(self._excluded_since)[None], excluded[:-1]])
+        starts = np.where(excluded & ~before, rows, -1)
+        first = np.maximum.accumulate(starts, axis=0)  # Row its exclusion began, -1 if earlier
+        since = np.where(first >= 0, times[np.maximum(first, 0)], self._excluded_since)
+        since = np.where(excluded, since, np.nan)
+        self._excluded_since = since[-1]
+        return excluded & (times[:, None] - since < self.max_exclusion)
+
+    def update(self, timestamps, values, excluded):
+        # Fold in a (rows, sensors) batch, skipping rows where `excluded` is
+        # set. Readings of one serial read share a timestamp, so the time
+        # since the previous batch is spread evenly over the rows.
+        values = np.asarray(values, dtype=float)
+        excluded = self._limit(timestamps, np.asarray(excluded, dtype=bool))
+        end = timestamps[-1]
+        if self.updated is None:
+            self.updated = end
+        step = max(end - self.updated, 0) / len(values)
+        self.updated = end
+        weights = np.where(excluded, 0.0, -np.expm1(-step / self.time_constant))
+
+        # The second EWMA reads every level in turn, so rows are stepped
+        # through one at a time (still one vector op per row for all sensors)
+        level, smooth = self.level, self.smooth
+        for weight, row in zip(weights, values):
+            level = level + weight * (row - level)
+            smooth = smooth + weight * (level - smooth)
+        self.level, self.smooth = level, smooth
+        return self.value
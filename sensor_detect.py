@@ -0,0 +1,267 @@
+import numpy as np
+
+# Anomaly detection over a rolling window of readings. Each device keeps a
+# DetectionEngine fed with the readings of every serial read as one
+# (rows, sensors) batch; every detector evaluates the whole batch with
+# array operations and keeps O(sensors) state, so the cost per reading
+# stays constant however long the window or high the sample rate.
+#
+# Detectors compare readings with the device baseline, in units of the
+# per-sensor alert threshold, and return a (rows, sensors) bool array.
+
+
+class RingBuffer:
+    # The last `size` rows of a float series with `columns` columns. Rows
+    # go into an array twice that long and the live rows are only moved
+    # back to the front when the end is reached, so appends are O(1)
+    # amortized and window() is always a view, never a copy.
+    def __init__(self, size, columns):
+        self.size = size
+        self.total = 0  # Rows ever appended
+        self._data = np.zeros((2 * size, columns))
+        self._end = 0
+
+    def extend(self, rows):
+        self.total += len(rows)
+        rows = rows[-self.size:]
+        count = len(rows)
+        if self._end + count > len(self._data):
+            keep = min(self._end, self.size - count)
+            self._data[:keep] = self._data[self._end - keep:self._end]
+            self._end = keep
+        self._data[self._end:self._end + count] = rows
+        self._end += count
+
+    def clear(self):
+        self.total = 0
+        self._end = 0
+
+    def window(self, count):
+        # Up to the newest `count` rows, oldest first
+        count = min(count, self.total, self.size)
+        return self._data[self._end - count:self._end]
+
+
+class Detector:
+    name = None
+    lookback = 0  # Rows before the batch that update() reads from the engine
+    drift = False  # Fires on slow drift, which the baseline should still follow
+
+    def update(self, engine, timestamps, values, baseline, thresholds):
+        raise NotImplementedError
+
+    def reset(self):
+        # Forget state built against the previous baseline
+        pass
+
+
+class ThresholdDetector(Detector):
+    # The original rule: any single reading above baseline + threshold
+    name = "threshold"
+
+    def __init__(self, sensor_count):
+        pass
+
+    def update(self, engine, timestamps, values, baseline, thresholds):
+        return values - baseline > thresholds
+
+
+class EWMADetector(Detector):
+    # Exponentially weighted moving average above baseline + threshold, so
+    # a single noisy sample no longer raises an alert
+    name = "ewma"
+
+    def __init__(self, sensor_count, alpha=0.3):
+        self.alpha = alpha
+        self.average = None
+        self._weights = self._decay = np.zeros((0, 0))
+
+    def _prepare(self, count):
+        # s[i] = (1-a)^(i+1) s[-1] + sum_j a (1-a)^(i-j) x[j] for a whole
+        # batch at once; the engine's chunking keeps this matrix small
+        decay = (1 - self.alpha) ** np.arange(count + 1)
+        lag = np.subtract.outer(np.arange(count), np.arange(count))
+        self._weights = np.where(lag >= 0, self.alpha * decay[np.clip(lag, 0, count)], 0.0)
+        self._decay = decay[1:]
+
+    def update(self, engine, timestamps, values, baseline, thresholds):
+        if self.average is None:
+            self.average = values[0].copy()
+        count = len(values)
+        if count > len(self._decay):
+            self._prepare(count)
+        averages = (self._decay[:count, None] * self.average
+                    + self._weights[:count, :count] @ values)
+        self.average = averages[-1]
+        return averages - baseline > thresholds
+
+    def reset(self):
+        self.average = None
+
+
+class ZScoreDetector(Detector):
+    # Reading more than `limit` standard deviations above the mean of the
+    # `window` readings before it. Running sums make each step O(1); they
+    # are recomputed exactly once per window to stop rounding drift. The
+    # deviation never counts as less than `floor` thresholds, so a flat
+    # signal doesn't alert on the smallest wiggle.
+    name = "zscore"
+
+    def __init__(self, sensor_count, window=120, limit=4.0, floor=0.25, min_samples=10):
+        self.window = window
+        self.lookback = window
+        self.limit = limit
+        self.floor = floor
+        self.min_samples = min_samples
+        self._sum = np.zeros(sensor_count)
+        self._squares = np.zeros(sensor_count)
+        self._since_exact = 0
+
+    def update(self, engine, timestamps, values, baseline, thresholds):
+        count = len(values)
+        recent = engine.values.window(self.window + count)
+        before = engine.values.total - count  # Readings ahead of this batch
+
+        # Row leaving the window as each new row enters it (zero if none)
+        index = len(recent) - count - self.window + np.arange(count)
+        leaving = np.zeros_like(values)
+        present = index >= 0
+        leaving[present] = recent[index[present]]
+
+        change = values - leaving
+        change_squares = values ** 2 - leaving ** 2
+        sums = self._sum + np.cumsum(change, axis=0)
+        squares = self._squares + np.cumsum(change_squares, axis=0)
+        n = np.minimum(before + np.arange(count), self.window)[:, None]
+
+        # Stats of the window before each row (n is 0 only ahead of min_samples)
+        size = np.maximum(n, 1)
+        mean = (sums - change) / size
+        variance = np.maximum((squares - change_squares) / size - mean ** 2, 0)
+        deviation = np.maximum(np.sqrt(variance), self.floor * thresholds)
+        flags = (values - mean > self.limit * deviation) & (n >= self.min_samples)
+
+        self._sum, self._squares = sums[-1], squares[-1]
+        self._since_exact += count
+        if self._since_exact >= self.window:
+            exact = engine.values.window(self.window)
+            self._sum, self._squares = exact.sum(axis=0), (exact ** 2).sum(axis=0)
+            self._since_exact = 0
+        return flags
+
+    def reset(self):
+        # The engine empties its window too
+        self._sum[:] = 0
+        self._squares[:] = 0
+        self._since_exact = 0
+
+
+class CUSUMDetector(Detector):
+    # One-sided CUSUM of (reading - baseline) / threshold - slack; alerts
+    # while the sum exceeds `limit`, so a slow drift that never crosses the
+    # threshold in one reading is still caught. The sum stops at `cap`
+    # times the limit, so a long event can't leave it high enough to keep
+    # alerting for hours after the reading is back to normal.
+    name = "cusum"
+    drift = True
+
+    def __init__(self, sensor_count, slack=0.5, limit=5.0, cap=3.0):
+        self.slack = slack
+        self.limit = limit
+        self.cap = cap
+        self.sum = np.zeros(sensor_count)
+
+    def update(self, engine, timestamps, values, baseline, thresholds):
+        # S[i] = max(0, S[i-1] + d[i]) == C[i] - min(0, min C[:i+1]) for
+        # the plain running sum C, which vectorizes. Only a batch that
+        # reaches the cap is stepped through row by row.
+        steps = (values - baseline) / thresholds - self.slack
+        totals = self.sum + np.cumsum(steps, axis=0)
+        sums = totals - np.minimum.accumulate(np.minimum(totals, 0), axis=0)
+        top = self.cap * self.limit
+        if (sums > top).any():
+            total = self.sum
+            for i, step in enumerate(steps):
+                total = sums[i] = np.clip(total + step, 0, top)
+        self.sum = sums[-1]
+        return sums > self.limit
+
+    def reset(self):
+        self.sum[:] = 0
+
+
+class RateOfChangeDetector(Detector):
+    # Rise faster than `limit` thresholds per second, measured over `lag`
+    # readings
+    name = "rate"
+
+    def __init__(self, sensor_count, lag=5, limit=1.0):
+        self.lag = lag
+        self.lookback = lag
+        self.limit = limit
+
+    def update(self, engine, timestamps, values, baseline, thresholds):
+        count = len(values)
+        recent = engine.values.window(self.lag + count)
+        times = engine.times.window(self.lag + count)[:, 0]
+        index = len(recent) - count + np.arange(count) - self.lag
+        present = index >= 0
+        flags = np.zeros(values.shape, dtype=bool)
+        if present.any():
+            earlier = index[present]
+            elapsed = (timestamps[present] - times[earlier])[:, None]
+            rise = values[present] - recent[earlier]
+            flags[present] = (elapsed > 0) & (rise > self.limit * thresholds * elapsed)
+        return flags
+
+
+# Detector name -> class, for the DETECTORS setting; add new ones here
+DETECTOR_TYPES = {
+    cls.name: cls
+    for cls in (ThresholdDetector, EWMADetector, ZScoreDetector, CUSUMDetector, RateOfChangeDetector)
+}
+
+
+def make_detectors(sensor_count, config):
+    # [(name, options), ...] -> detector instances
+    detectors = []
+    for name, options in config:
+        detectors.append(DETECTOR_TYPES[name](sensor_count, **options))
+    return detectors
+
+
+class DetectionEngine:
+    # Runs every detector over each batch of readings of one device
+    def __init__(self, sensor_count, detectors, chunk=64):
+        self.detectors = detectors
+        self.chunk = chunk
+        lookback = max((detector.lookback for detector in detectors), default=0)
+        self.values = RingBuffer(lookback + chunk, sensor_count)
+        self.times = RingBuffer(lookback + chunk, 1)
+
+    def update(self, timestamps, values, baseline, thresholds):
+        # (rows,) timestamps and (rows, sensors) values -> {detector name:
+        # (rows, sensors) bool flags}
+        timestamps = np.asarray(timestamps, dtype=float)
+        values = np.asarray(values, dtype=float).reshape(len(timestamps), -1)
+        baseline = np.asarray(baseline, dtype=float)
+        thresholds = np.asarray(thresholds, dtype=float)
+        results = {detector.name: [np.zeros((0, values.shape[1]), dtype=bool)]
+                   for detector in self.detectors}
+        for start in range(0, len(values), self.chunk):
+            times = timestamps[start:start + self.chunk]
+            rows = values[start:start + self.chunk]
+            self.values.extend(rows)
+            self.times.extend(times[:, None])
+            for detector in self.detectors:
+                results[detector.name].append(
+                    detector.update(self, times, rows, baseline, thresholds)
+                )
+        return {name: np.concatenate(parts) for name, parts in results.items()}
+
+    def reset(self):
+        # After a recalibration: detectors start over from the new baseline
+        self.values.clear()
+        self.times.clear()
+        for detector in self.detectors:
+            detector.reset()
@@ -0,0 +1,443 @@
+import glob
+import gzip
+import itertools
+import json
+import os
+import selectors
+import threading
+import time
+
+import serial
+
+from sensor_alerts import AlertTracker
+from sensor_baseline import BaselineJob, DriftingBaseline
+from sensor_detect import DetectionEngine, make_detectors
+from sensor_history import History
+from sensor_parser import FrameParser
+from sensor_stream import EventStream
+
+
+def select_sensors(payload, sensors, schema):
+    # Copy of a /data or event payload limited to `sensors`: per-sensor maps
+    # and samples keep only those keys, `baseline` follows their order and
+    # `alerts` only keeps their messages
+    def keep(entry):
+        return {key: value for key, value in entry.items()
+                if key in sensors or key not in schema.names}
+
+    result = dict(payload)
+    for key in ("readings", "alert_status", "detections", "active_alerts", "sample"):
+        if key in result:
+            result[key] = keep(result[key])
+    if "history" in result:
+        result["history"] = [keep(entry) for entry in result["history"]]
+    if result.get("baseline") is not None:
+        result["baseline"] = [payload["baseline"][schema.index(name)] for name in sensors]
+    if "alerts" in result:
+        status = payload["alert_status"]
+        result["alerts"] = [sensor.message for sensor in schema.sensors
+                            if sensor.name in sensors and status[sensor.name]]
+    return result
+
+
+def encode_data(state, history, reset, sensors=None):
+    # /data body: `state` plus a HistoryView, whose rows are encoded
+    # straight from its columns (only those of `sensors` if given)
+    head = json.dumps({**state, "reset": reset}, separators=(',', ':'))
+    return b'%s,"history":%s}' % (head[:-1].encode('utf-8'), history.to_json(sensors))
+
+
+class Snapshot:
+    # Immutable view of one device as of its last published reading:
+    # `state` (readings, alerts, baseline, alert_status, seq), the chart
+    # `history` as a HistoryView, and `body`, the full /data response
+    # (plus a gzip copy when it's worth compressing). `etag` names this
+    # snapshot, so a client that already has it gets a 304. The ingest
+    # thread swaps in a new snapshot per sample, so readers never mix two
+    # samples and never take a lock. The body is only serialized when
+    # first asked for, so a long history costs nothing while nobody
+    # fetches it; a lock makes concurrent readers wait for one encoding
+    # instead of each running their own. With a long history that takes a
+    # good fraction of a second, so async servers check costly() and
+    # encode on a worker thread.
+    __slots__ = ("state", "history", "etag", "gzip_min_size", "_body", "_gzip_body", "_lock")
+
+    def __init__(self, state, history, etag, gzip_min_size=1024):
+        self.state = state
+        self.history = history
+        self.etag = etag
+        self.gzip_min_size = gzip_min_size
+        self._body = self._gzip_body = None
+        self._lock = threading.Lock()
+
+    @property
+    def body(self):
+        if self._body is None:
+            with self._lock:
+                if self._body is None:
+                    self._body = encode_data(self.state, self.history, True)
+        return self._body
+
+    @property
+    def gzip_body(self):
+        # None when the body is too small to be worth compressing
+        if self._gzip_body is None:
+            body = self.body
+            with self._lock:
+                if self._gzip_body is None:
+                    self._gzip_body = (gzip.compress(body, 5) if len(body) >= self.gzip_min_size
+                                       else b"")
+        return self._gzip_body or None
+
+    def costly(self, since=None, accepts_gzip=False, rows=256):
+        # Whether respond() / to_json() for `since` has more than a few rows
+        # to encode or compress
+        history, reset = self.history_since(since)
+        if reset:
+            return self._body is None or (accepts_gzip and self._gzip_body is None)
+        return len(history) > rows
+
+    def history_since(self, since):
+        # Readings newer than `since`, plus whether the client must drop what
+        # it has (unknown seq, or it fell out of the window)
+        if since is None or since > self.state["seq"]:
+            return self.history, True
+        return self.history.since(since)
+
+    def respond(self, since, if_none_match, accepts_gzip):
+        # /data response as (status, body, headers) for any server: a 304 when
+        # the client already holds this snapshot, otherwise the cached body
+        # (gzipped if accepted) or the serialized delta after `since`
+        etag, gzip_etag = self.etag, self.etag + "-gz"
+        headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag in if_none_match or gzip_etag in if_none_match:
+            headers["ETag"] = f'"{etag}"'
+            return 304, b"", headers
+        history, reset = self.history_since(since)
+        if not reset:
+            body = encode_data(self.state, history, False)
+        elif accepts_gzip and self.gzip_body is not None:
+            body, etag = self.gzip_body, gzip_etag
+            headers["Content-Encoding"] = "gzip"
+        else:
+            body = self.body
+        headers["ETag"] = f'"{etag}"'
+        headers["Content-Type"] = "application/json"
+        return 200, body, headers
+
+    def to_json(self, since=None):
+        # /data body: the cached full response, or just the delta after `since`
+        history, reset = self.history_since(since)
+        if reset:
+            return self.body
+        return encode_data(self.state, history, False)
+
+    def filtered(self, sensors, schema):
+        # Full /data body limited to `sensors` (see select_sensors); not cached
+        return encode_data(select_sensors(self.state, sensors, schema), self.history, True,
+                           sensors)
+
+
+class Device:
+    # One sensor board: its serial port, parser, baseline, anomaly
+    # detectors, chart history, alert state and /stream subscribers. Its
+    # channels are the ones in `schema` (a SensorSchema), in that order;
+    # per-reading state is kept as plain sequences in schema order and only
+    # turned into {sensor: value} maps when a snapshot is published.
+    # `thresholds` ({sensor: threshold}) overrides the schema's for this
+    # board, e.g. one mounted somewhere with more background gas.
+    def __init__(self, name, port, store, schema, history_length=20,
+                 publish_every=1, max_coalesce=10, baseline_samples=5,
+                 baseline_time_constant=None, baseline_max_exclusion=900.0, detectors=(("threshold", {}),),
+                 alert_options=None, thresholds=None):
+        self.name = name
+        self.port = port
+        self.store = store
+        self.schema = schema
+        count = len(schema)
+        self.parser = FrameParser(sensor_count=count)
+        self.events = EventStream()
+        self.connected = True
+
+        self.latest_values = (0,) * count
+        self.baseline = [0] * count
+        self.thresholds = list(schema.thresholds)
+        for sensor, threshold in (thresholds or {}).items():
+            if sensor not in schema.names:
+                raise ValueError(f"unknown sensor {sensor!r} in thresholds of {name}")
+            self.thresholds[schema.index(sensor)] = float(threshold)
+        self.alerting = [False] * count
+        self.detected = [[] for _ in range(count)]  # Detectors firing per sensor
+        self.detection = DetectionEngine(count, make_detectors(count, detectors))
+        # Detector flags debounced into alerts; transitions are logged
+        self.tracker = AlertTracker(schema.names, **(alert_options or {}))
+        self.active_alerts = {}  # Sensor -> log entry of its ongoing alert
+
+        # Last `history_length` published readings for the chart
+        self.history = History(schema.names, history_length)
+        self.reading_seq = 0  # Sequence number of the newest reading, never reset
+
+        # Only every `publish_every`-th reading reaches history and
+        # dashboards; at least every publish_every * max_coalesce during bursts
+        self.publish_every = publish_every
+        self.max_coalesce = max_coalesce
+        self.unpublished = 0
+
+        # Recalibration fed by process(); the first one runs at startup
+        self.baseline_samples = baseline_samples
+        self.baseline_job = BaselineJob(baseline_samples)
+        self.calibrated = False
+        self._baseline_lock = threading.Lock()
+
+        # Afterwards the baseline follows slow drift, unless the time constant is None
+        self.drift = None
+        if baseline_time_constant is not None:
+            self.drift = DriftingBaseline(count, baseline_time_constant, baseline_max_exclusion)
+        self._drift_detectors = {detector.name for detector in self.detection.detectors
+                                 if detector.drift}
+
+        # Latest published state; replaced wholesale, never mutated. ETags
+        # combine the device's start time with a per-snapshot version so a
+        # restart can't produce a stale match.
+        self._publish_lock = threading.Lock()  # Ingest thread vs clear_history
+        self._versions = itertools.count()
+        self._epoch = int(time.time())
+        self.snapshot = self._build_snapshot(self._state())
+
+    def process(self, readings, backlog):
+        # Readings from one read of the port, oldest first; `backlog` is
+        # set when more are already buffered behind them
+        batch = []
+        for reading in readings:
+            # Recalibration samples come from the ingest loop, never a second reader
+            job = self.baseline_job
+            if job.add(reading.values):
+                self._evaluate(batch, backlog=True)  # Against the old baseline
+                batch = []
+                self.baseline = job.baseline
+                self.detection.reset()
+                if self.drift is not None:
+                    self.drift.reset(job.baseline, reading.timestamp)
+                self.calibrated = True
+                self.events.publish("baseline", job.status())
+            if self.calibrated:
+                batch.append(reading)  # Startup calibration skips the rest
+        self._evaluate(batch, backlog)
+
+    def _evaluate(self, readings, backlog):
+        if not readings:
+            return
+        for reading in readings:
+            self.store.append(self.name, reading.timestamp, reading.values)
+
+        # Every detector runs over the whole batch at once
+        timestamps = [reading.timestamp for reading in readings]
+        values = [reading.values for reading in readings]
+        baseline = self.baseline
+        flags = self.detection.update(timestamps, values, baseline, self.thresholds)
+        alerting, transitions = self.tracker.update(
+            timestamps, values, flags, baseline, self.thresholds
+        )
+        if self.drift is not None:
+            # Takes effect from the next batch. Readings of an alert raised
+            # by a sudden change don't count; drift detectors (CUSUM) are
+            # left out, since their alert is the drift the baseline follows.
+            sudden = sum(rows for name, rows in flags.items() if name not in self._drift_detectors)
+            self.baseline = self.drift.update(timestamps, values, alerting & (sudden > 0)).tolist()
+
+        transitions.reverse()  # Pop them in row order
+        for i, reading in enumerate(readings):
+            now = reading.timestamp
+            while transitions and transitions[-1][0] == i:
+                self._log_alert(transitions.pop()[1])
+
+            # Decimate what reaches history and dashboards. While more
+            # readings are already buffered only the newest of the burst is
+            # published, so clients never lag behind the port.
+            self.unpublished += 1
+            if self.unpublished < self.publish_every:
+                continue
+            if (backlog or i + 1 < len(readings)) and \
+                    self.unpublished < self.publish_every * self.max_coalesce:
+                continue
+            self.unpublished = 0
+            self.latest_values = reading.values
+            self._update_alerts(flags, alerting, i)
+
+            with self._publish_lock:
+                # Add to history with timestamp and sequence number
+                self.reading_seq += 1
+                state = self._state()
+                sample = {"seq": self.reading_seq, "timestamp": now, **state["readings"]}
+                self.history.append(self.reading_seq, now, reading.values)
+                snapshot = self._build_snapshot(state)
+                self.snapshot = snapshot
+
+            # Push the new sample to stream clients instead of waiting for
+            # polls; alert changes travel as their own "alert" events
+            state = snapshot.state
+            self.events.publish("reading", {
+                "device": self.name,
+                "readings": state["readings"],
+                "baseline": state["baseline"],
+                "detections": state["detections"],
+                "seq": state["seq"],
+                "sample": sample
+            })
+
+        if self.unpublished:
+            self.latest_values = readings[-1].values
+            self._update_alerts(flags, alerting, -1)
+
+    def _update_alerts(self, flags, alerting, row):
+        # Alert state as of reading `row` of the batch
+        self.alerting = alerting[row].tolist()
+        self.detected = [
+            [detector for detector, rows in flags.items() if rows[row, i]]
+            for i in range(len(self.schema))
+        ]
+
+    def _log_alert(self, event):
+        # Append an alert start/end to the log and push it to clients
+        message = self.schema.messages[self.schema.index(event["sensor"])]
+        entry = self.store.append_alert(self.name, {**event, "message": message})
+        if entry["state"] == "active":
+            self.active_alerts = {**self.active_alerts, entry["sensor"]: entry}
+        else:
+            self.active_alerts = {
+                sensor: active for sensor, active in self.active_alerts.items()
+                if sensor != entry["sensor"]
+            }
+        self.events.publish("alert", entry)
+
+    def _build_snapshot(self, state):
+        etag = f"{self.name}-{self._epoch}-{next(self._versions)}"
+        return Snapshot(state, self.history.view(), etag)
+
+    def _state(self):
+        # The /data shape: per-sensor maps keyed by schema name
+        names = self.schema.names
+        return {
+            "device": self.name,
+            "readings": dict(zip(names, self.latest_values)),
+            "alerts": [message for message, active in zip(self.schema.messages, self.alerting)
+                       if active],
+            "baseline": self.baseline,
+            "alert_status": dict(zip(names, self.alerting)),
+            "detections": dict(zip(names, self.detected)),
+            "active_alerts": self.active_alerts,
+            "seq": self.reading_seq
+        }
+
+    def reset_baseline(self):
+        # Starts a background recalibration and returns its status; a request
+        # made while one is already collecting samples joins that job
+        with self._baseline_lock:
+            if self.baseline_job.done:
+                self.baseline_job = BaselineJob(self.baseline_samples)
+                self.events.publish("baseline", self.baseline_job.status())
+            return self.baseline_job.status()
+
+    def clear_history(self):
+        with self._publish_lock:
+            self.history.clear()
+            self.snapshot = self._build_snapshot(self.snapshot.state)
+        self.events.publish("cleared", {})
+
+
+class DeviceRegistry:
+    # All sensor boards served by this process. One thread multiplexes every
+    # port with a selector (ports without a pollable file descriptor, such
+    # as Windows COM ports, are polled instead), so dozens of boards don't
+    # need dozens of reader threads. `thresholds` maps device name ->
+    # {sensor: threshold} overrides; every other option is shared.
+    def __init__(self, store, baudrate=9600, poll_interval=0.005, thresholds=None,
+                 **device_options):
+        self.store = store
+        self.baudrate = baudrate
+        self.poll_interval = poll_interval
+        self.thresholds = thresholds or {}
+        self.device_options = device_options
+        self.devices = {}
+
+    def open(self, ports):
+        # `ports` maps device name -> port path; a path containing a glob
+        # pattern (e.g. "/dev/ttyUSB*") adds one device per match, named
+        # after the port
+        for name, pattern in ports.items():
+            if glob.has_magic(pattern):
+                matches = [(os.path.basename(path), path) for path in sorted(glob.glob(pattern))]
+            else:
+                matches = [(name, pattern)]
+            for device_name, path in matches:
+                port = serial.Serial(port=path, baudrate=self.baudrate, timeout=0)
+                self.devices[device_name] = Device(
+                    device_name, port, self.store,
+                    thresholds=self.thresholds.get(device_name), **self.device_options
+                )
+        time.sleep(2)  # Wait for Arduino reset
+
+    def get(self, name=None):
+        # Device by name; the first one when no name is given
+        if name is None:
+            return next(iter(self.devices.values()), None)
+        return self.devices.get(name)
+
+    def summary(self):
+        return {
+            name: {
+                "connected": device.connected,
+                "seq": device.snapshot.state["seq"],
+                "alert_status": device.snapshot.state["alert_status"],
+                "ingest": device.parser.stats()
+            }
+            for name, device in self.devices.items()
+        }
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        selector = selectors.DefaultSelector()
+        polled = []
+        for device in self.devices.values():
+            try:
+                selector.register(device.port, selectors.EVENT_READ, device)
+            except ValueError:
+                polled.append(device)
+
+        while True:
+            if selector.get_map():
+                # Wait on the selectable ports; bounded while others need polling
+                for key, _ in selector.select(self.poll_interval if polled else None):
+                    self.read_selected(key.data, selector)
+            elif not polled:
+                time.sleep(1)  # Every board is gone
+                continue
+            idle = True
+            for device in polled:
+                if device.connected and self.read(device):
+                    idle = False
+            if idle and not selector.get_map():
+                time.sleep(self.poll_interval)
+
+    def read_selected(self, device, selector):
+        if not self.read(device) and not device.connected:
+            # Board unplugged: stop watching it, keep serving the others
+            try:
+                selector.unregister(device.port)
+            except (KeyError, ValueError):
+                pass
+
+    def read(self, device):
+        # Drain whatever the port has buffered; False when nothing was read
+        # (device.connected turns False if the board went away)
+        try:
+            readings = device.parser.read_from(device.port)
+            more = device.port.in_waiting
+        except (serial.SerialException, OSError):
+            device.connected = False
+            return False
+        if readings:
+            device.process(readings, backlog=bool(more))
+        return bool(readings)
@@ -0,0 +1,86 @@
+import os
+import threading
+
+from sensor_devices import DeviceRegistry
+from sensor_schema import SensorSchema
+from sensor_store import ReadingStore
+
+# Sensor boards to read, name -> serial port. A glob such as
+# "/dev/ttyUSB*" adds one device per matching port, named after the port.
+# Raise BAUDRATE together with the Arduino sketch for 10-100 Hz sampling.
+SERIAL_PORTS = {"default": "COM5"}
+BAUDRATE = 9600
+DB_PATH = "aevur.db"
+
+# The sensors on every board, with their thresholds and alert messages
+SENSORS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sensors.json")
+
+# Per-board settings: readings kept for the graph and sent by /data (stored
+# by column, ~12 bytes a reading, so 36000 keeps an hour at 10 Hz). Only
+# every PUBLISH_EVERY-th reading goes to the chart history and dashboards;
+# during bursts at least every PUBLISH_EVERY * MAX_COALESCE.
+HISTORY_LENGTH = 20
+PUBLISH_EVERY = 1
+MAX_COALESCE = 10
+BASELINE_SAMPLES = 5  # Readings averaged per recalibration
+# After calibration the baseline tracks drift slower than this many
+# seconds (None keeps it fixed). Readings during an alert are ignored, but
+# for no longer than BASELINE_MAX_EXCLUSION seconds.
+BASELINE_TIME_CONSTANT = 1800
+BASELINE_MAX_EXCLUSION = 900
+
+# Per-board threshold overrides, device name -> {sensor: threshold}; a
+# board or sensor left out uses the threshold in SENSORS_FILE, e.g.
+# {"kitchen": {"MQ-135": 0.08}}. Detector limits scale with them.
+THRESHOLDS = {}
+
+# Anomaly detectors raising alerts, as (name, options) from
+# sensor_detect.DETECTOR_TYPES; limits are in units of each sensor's threshold.
+# ("threshold", {}) alone is the old single-reading rule.
+DETECTORS = [
+    ("ewma", {"alpha": 0.3}),
+    ("zscore", {"window": 120, "limit": 4.0}),
+    ("cusum", {"slack": 0.5, "limit": 5.0, "cap": 3.0}),
+    ("rate", {"lag": 5, "limit": 2.0})
+]
+
+# Alert debouncing (see sensor_alerts.AlertTracker): an alert starts once
+# detectors fire for min_duration seconds and ends after the reading has
+# been back under exit_ratio thresholds, detectors quiet, for clear_after
+ALERTS = {"min_duration": 1.0, "clear_after": 3.0, "exit_ratio": 0.5}
+
+# The one ingest pipeline of this process, shared by every dashboard view
+schema = None
+store = None
+devices = None
+_start_lock = threading.Lock()
+
+
+def start(background=True):
+    # Open the store and serial ports and start the reader thread, once per
+    # process however many views ask for it. With background=False the
+    # caller drives devices.read() itself (see asgi.py).
+    global schema, store, devices
+    with _start_lock:
+        if devices is None:
+            schema = SensorSchema.load(SENSORS_FILE)
+            store = ReadingStore(DB_PATH, schema.names)
+            registry = DeviceRegistry(
+                store,
+                baudrate=BAUDRATE,
+                thresholds=THRESHOLDS,
+                schema=schema,
+                history_length=HISTORY_LENGTH,
+                publish_every=PUBLISH_EVERY,
+                max_coalesce=MAX_COALESCE,
+                baseline_samples=BASELINE_SAMPLES,
+                baseline_time_constant=BASELINE_TIME_CONSTANT,
+                baseline_max_exclusion=BASELINE_MAX_EXCLUSION,
+                detectors=DETECTORS,
+                alert_options=ALERTS
+            )
+            registry.open(SERIAL_PORTS)
+            if background:
+                registry.start()
+            devices = registry
+    return devices
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import math
+import time
+from datetime import datetime
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+# /export: a device's stored readings in [start, end) as CSV, NDJSON or
+# Parquet. Each format is a generator of byte chunks fed by
+# ReadingStore.iter_range, so memory stays constant however long the
+# range; servers send every chunk as it is produced.
+
+FORMATS = {
+    # name -> (content type, file extension)
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet")
+}
+
+DEFAULT_RANGE = 86400  # Seconds exported when ?from= is left out
+
+
+def chunks(rows, size):
+    # Lists of up to `size` rows
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_csv(store, device, start, end, batch_size=1000):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(["timestamp"] + store.sensors)
+    for batch in chunks(store.iter_range(device, start, end), batch_size):
+        writer.writerows(batch)  # None (sensor added later) becomes ""
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')  # Header of an empty export
+
+
+def export_ndjson(store, device, start, end, batch_size=1000):
+    keys = ["timestamp"] + store.sensors
+    for batch in chunks(store.iter_range(device, start, end), batch_size):
+        yield "".join(json.dumps(dict(zip(keys, row))) + "\n" for row in batch).encode('utf-8')
+
+
+class _Drain:
+    # Write-only file for ParquetWriter whose output is taken out after
+    # every row group, so the file is never held in memory whole
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def export_parquet(store, device, start, end, row_group_size=65536):
+    columns = ["timestamp"] + store.sensors
+    schema = pyarrow.schema([(name, pyarrow.float64()) for name in columns])
+    sink = _Drain()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    for batch in chunks(store.iter_range(device, start, end), row_group_size):
+        values = list(zip(*batch))
+        writer.write_table(pyarrow.table(
+            [pyarrow.array(column, pyarrow.float64()) for column in values], schema=schema
+        ))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+EXPORTERS = {"csv": export_csv, "ndjson": export_ndjson, "parquet": export_parquet}
+
+
+def parse_time(text, default):
+    # Epoch seconds or an ISO date ("2024-05-01", "2024-05-01T12:00");
+    # dates without a timezone are local time like the board clocks
+    if not text:
+        return default
+    try:
+        value = float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+    if not math.isfinite(value):
+        raise ValueError(f"time must be finite, got {text!r}")
+    return value
+
+
+def export(store, device, args):
+    # (headers, chunk generator) for the ?from=&to=&format= of an /export
+    # request; ValueError for bad times or a format that isn't available
+    end = parse_time(args.get("to"), time.time())
+    start = parse_time(args.get("from"), end - DEFAULT_RANGE)
+    fmt = args.get("format") or "csv"
+    if start >= end:
+        raise ValueError("from must be before to")
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    if fmt == "parquet" and pyarrow is None:
+        raise ValueError("parquet export needs pyarrow installed")
+    content_type, extension = FORMATS[fmt]
+    filename = f"aevur-{device}-{int(start)}-{int(end)}.{extension}"
+    headers = {"Content-Type": content_type,
+               "Content-Disposition": f'attachment; filename="{filename}"',
+               "Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    return headers, EXPORTERS[fmt](store, device, start, end)
@@ -0,0 +1,97 @@
+import json
+
+import numpy as np
+
+
+class HistoryView:
+    # Immutable run of consecutive published readings: `times` (float64)
+    # and `values` (float32, one column per sensor) are views into a
+    # History's arrays, and the readings' seqs run from `first_seq` up. The
+    # History never writes to rows a view can see, so a snapshot can hand
+    # one to any thread without copying or locking.
+    __slots__ = ("names", "first_seq", "times", "values")
+
+    def __init__(self, names, first_seq, times, values):
+        self.names = names
+        self.first_seq = first_seq
+        self.times = times
+        self.values = values
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def last_seq(self):
+        return self.first_seq + len(self.times) - 1
+
+    def since(self, seq):
+        # Readings newer than `seq`, plus whether the client must drop what
+        # it has because `seq` fell out of the window. Seqs are consecutive,
+        # so the delta start is a plain offset.
+        start = seq - self.first_seq + 1
+        if start < 0 and len(self.times):
+            return self, True
+        start = max(start, 0)
+        return HistoryView(self.names, self.first_seq + start,
+                           self.times[start:], self.values[start:]), False
+
+    def _columns(self, sensors=None):
+        # [(json key, [json value text, ...]), ...] for the chosen sensors;
+        # float32 values print in their shortest form ("0.1", not
+        # "0.10000000149011612")
+        columns = [('"seq"', np.arange(self.first_seq, self.first_seq + len(self)).astype(str)),
+                   ('"timestamp"', self.times.astype(str))]
+        for i, name in enumerate(self.names):
+            if sensors is None or name in sensors:
+                column = self.values[:, i]
+                text = np.where(np.isfinite(column), column.astype(str), "null")
+                columns.append((json.dumps(name), text))
+        return columns
+
+    def to_json(self, sensors=None):
+        # The /data "history" array, encoded straight from the columns,
+        # optionally only for some sensors
+        columns = self._columns(sensors)
+        template = "{" + ",".join(f"{key}:%s" for key, _ in columns) + "}"
+        rows = ",".join(template % row for row in zip(*(text for _, text in columns)))
+        return f"[{rows}]".encode('utf-8')
+
+
+class History:
+    # The last `size` published readings of one device, stored by column:
+    # float64 timestamps and a float32 column per sensor, a few bytes per
+    # reading instead of a dict each. Rows go into arrays twice the window;
+    # when the end is reached the live rows move to fresh arrays (never
+    # over rows an older view may still read), so append() is O(1)
+    # amortized and view() is a zero-copy slice.
+    def __init__(self, names, size):
+        self.names = tuple(names)
+        self.size = size
+        self.seq = 0  # Seq of the newest reading
+        self._allocate(0)
+
+    def _allocate(self, keep):
+        times = np.empty(2 * self.size)
+        values = np.empty((2 * self.size, len(self.names)), dtype=np.float32)
+        if keep:
+            times[:keep] = self._times[self._end - keep:self._end]
+            values[:keep] = self._values[self._end - keep:self._end]
+        self._times, self._values = times, values
+        self._start, self._end = 0, keep
+
+    def append(self, seq, timestamp, values):
+        if self._end == len(self._times):
+            self._allocate(self._end - self._start)
+        self._times[self._end] = timestamp
+        self._values[self._end] = values
+        self._end += 1
+        self._start = max(self._start, self._end - self.size)
+        self.seq = seq
+
+    def clear(self):
+        self._allocate(0)
+
+    def view(self):
+        start, end = self._start, self._end
+        return HistoryView(self.names, self.seq - (end - start) + 1,
+                           self._times[start:end], self._values[start:end])
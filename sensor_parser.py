@@ -0,0 +1,174 @@
+import binascii
+import struct
+import time
+from collections import namedtuple
+
+# One parsed frame: receive time and one float per sensor, in frame order
+Reading = namedtuple("Reading", ["timestamp", "values"])
+
+# Binary frames (see arduino/aevur_sensors/aevur_sensors.ino):
+#
+#     0xA5 | header | values... | CRC-16 low, high
+#
+# header bits 0-3 hold the sensor count and bit 7 selects the payload:
+# little-endian float32 values, or uint16 raw ADC counts when set. The
+# CRC is CRC-16/XMODEM over header and payload. Text frames are plain
+# ASCII, so a 0xA5 byte can only ever start a binary frame.
+SYNC = 0xA5
+HEADER_ADC = 0x80
+HEADER_COUNT = 0x0F
+
+
+class FrameParser:
+    # Incremental parser for the Arduino's frames. The text protocol sends
+    # one frame per line:
+    #
+    #     MQ-135: 0.123 MQ-138: 0.045
+    #
+    # and the binary protocol described above may be used instead; the two
+    # are told apart per frame, so either sketch works without configuration.
+    #
+    # Bytes are read from the port in bulk into a reusable chunk buffer and
+    # appended to a pending buffer; every complete frame is parsed and any
+    # partial tail is kept for the next read. Frames that don't parse, have
+    # the wrong number of values, fail their CRC or never terminate are
+    # counted in `malformed` instead of being silently skipped.
+    def __init__(self, sensor_count, chunk_size=4096, max_frame=256, adc_scale=5.0 / 1023):
+        self.sensor_count = sensor_count
+        self.max_frame = max_frame
+        self.adc_scale = adc_scale  # Raw ADC count -> same units as text frames
+        self.frames = 0
+        self.binary_frames = 0
+        self.malformed = 0
+        self._chunk = bytearray(chunk_size)
+        self._chunk_view = memoryview(self._chunk)
+        self._pending = bytearray()
+        self._floats = struct.Struct(f"<{sensor_count}f")
+        self._counts = struct.Struct(f"<{sensor_count}H")
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "binary_frames": self.binary_frames,
+            "malformed": self.malformed
+        }
+
+    def read_from(self, port):
+        # Read everything the port has buffered (waiting up to its timeout
+        # for the first byte) and return the readings it completed
+        size = min(max(port.in_waiting, 1), len(self._chunk))
+        count = port.readinto(self._chunk_view[:size])
+        if not count:
+            return []
+        return self.feed(self._chunk_view[:count])
+
+    def feed(self, data, timestamp=None):
+        pending = self._pending
+        pending += data
+        if timestamp is None:
+            timestamp = time.time()
+        if SYNC in pending:
+            readings = self._feed_mixed(timestamp)
+        else:
+            readings = self._feed_text(timestamp)
+        if len(pending) > self.max_frame:
+            # No terminator in sight: drop the garbage and resync on the next frame
+            self.malformed += 1
+            pending.clear()
+        return readings
+
+    def _feed_text(self, timestamp):
+        # Fast path while only text is buffered: split all complete lines at once
+        pending = self._pending
+        end = pending.rfind(b"\n")
+        if end < 0:
+            return []
+        lines = pending[:end].split(b"\n")
+        del pending[:end + 1]
+        readings = []
+        for line in lines:
+            values = self.parse_line(line)
+            if values is not None:
+                readings.append(Reading(timestamp, values))
+        return readings
+
+    def _feed_mixed(self, timestamp):
+        pending = self._pending
+        size = len(pending)
+        pos = 0
+        resync = False  # Skipping the rest of a rejected binary frame
+        readings = []
+        while pos < size:
+            if pending[pos] == SYNC:
+                if size - pos < 2:
+                    break
+                header = pending[pos + 1]
+                layout = self._counts if header & HEADER_ADC else self._floats
+                if header & HEADER_COUNT != self.sensor_count:
+                    # Not a frame we can decode (or a stray 0xA5): resync
+                    self.malformed += 1
+                    pos += 1
+                    resync = True
+                    continue
+                end = pos + 2 + layout.size + 2
+                if end > size:
+                    break
+                values = self.parse_binary(pending, pos, layout)
+                if values is None:
+                    pos += 1
+                    resync = True
+                    continue
+                readings.append(Reading(timestamp, values))
+                pos = end
+            else:
+                # Text frame, unless a binary frame starts before its newline
+                end = pending.find(b"\n", pos)
+                sync = pending.find(SYNC, pos, end if end >= 0 else size)
+                if sync >= 0:
+                    if not resync and pending[pos:sync].strip():
+                        self.malformed += 1
+                    pos = sync
+                    continue
+                if end < 0:
+                    break
+                if resync:
+                    # Leftover bytes of the rejected frame, up to a line end
+                    resync = False
+                    pos = end + 1
+                    continue
+                values = self.parse_line(pending[pos:end])
+                if values is not None:
+                    readings.append(Reading(timestamp, values))
+                pos = end + 1
+        del pending[:pos]
+        return readings
+
+    def parse_binary(self, buffer, pos, layout):
+        # Decode the complete binary frame at buffer[pos]; None if the CRC fails
+        self.frames += 1
+        body_end = pos + 2 + layout.size
+        crc = buffer[body_end] | buffer[body_end + 1] << 8
+        if binascii.crc_hqx(buffer[pos + 1:body_end], 0) != crc:
+            self.malformed += 1
+            return None
+        self.binary_frames += 1
+        values = layout.unpack_from(buffer, pos + 2)
+        if layout is self._counts:
+            scale = self.adc_scale
+            values = tuple(count * scale for count in values)
+        return values
+
+    def parse_line(self, line):
+        # b"MQ-135: 0.123 MQ-138: 0.045" -> (0.123, 0.045); None if malformed
+        fields = line.replace(b":", b" ").split()
+        if not fields:
+            return None  # Blank line between frames
+        self.frames += 1
+        if len(fields) != 2 * self.sensor_count:
+            self.malformed += 1
+            return None
+        try:
+            return tuple(map(float, fields[1::2]))
+        except ValueError:
+            self.malformed += 1
+            return None
@@ -0,0 +1,46 @@
+import json
+from collections import namedtuple
+
+# One channel of a board, in the order the board sends them: its name on
+# the wire and in /data, alert threshold (volts above baseline), alert
+# message, and how dashboards show it (card label, chart colour, picture
+# as a path under static/ or a full URL)
+Sensor = namedtuple("Sensor", ["name", "threshold", "message", "label", "color", "image"])
+
+SENSOR_DEFAULTS = {"color": "#888888", "image": None}
+
+
+class SensorSchema:
+    # The sensors every board reports. Parsing, baselines, thresholds,
+    # alert messages, the /data keys, the store columns and the dashboard
+    # cards are all driven from here, so adding a sensor is one entry in
+    # sensors.json (and the matching pin in the Arduino sketch).
+    def __init__(self, sensors):
+        self.sensors = tuple(sensors)
+        self.names = tuple(sensor.name for sensor in self.sensors)
+        if not self.names:
+            raise ValueError("no sensors defined")
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("duplicate sensor names")
+        self.thresholds = [sensor.threshold for sensor in self.sensors]
+        self.messages = [sensor.message for sensor in self.sensors]
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(
+            Sensor(**{**SENSOR_DEFAULTS, "label": entry["name"], **entry})
+            for entry in config["sensors"]
+        )
+
+    def __len__(self):
+        return len(self.sensors)
+
+    def index(self, name):
+        return self._index[name]
+
+    def to_json(self):
+        # For /sensors, from which the dashboards build their cards and chart
+        return {"sensors": [sensor._asdict() for sensor in self.sensors]}
@@ -0,0 +1,329 @@
+import atexit
+import itertools
+import json
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+# Rollup tiers kept next to the raw rows: bucket width in seconds -> name.
+# 1 s buckets keep minutes-long ranges light on 10-100 Hz boards.
+ROLLUP_TIERS = {1: "1s", 60: "1m", 900: "15m"}
+
+
+class ReadingStore:
+    # Append-only SQLite time-series of sensor readings, keyed by device.
+    # The serial loop only puts rows on an in-memory queue; a writer thread
+    # commits them in batches so disk I/O never stalls sampling. WAL mode
+    # lets range queries from request handlers run while the writer is
+    # committing.
+    #
+    # The writer also keeps min/max/mean rollups per ROLLUP_TIERS bucket,
+    # updated incrementally from each batch, so long ranges are read from a
+    # small table keyed by (device, bucket) rather than aggregated from raw
+    # rows.
+    #
+    # Alert transitions go to an append-only alert_events table the same
+    # way, numbered as they happen so clients can ask for everything after
+    # the last id they saw.
+    def __init__(self, path, sensors, flush_interval=1.0, batch_size=1000,
+                 max_pending=100000):
+        self.path = path
+        self.sensors = list(sensors)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dropped = 0  # Rows discarded because the writer fell behind
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._pending_alerts = queue.Queue()
+        self._stop = threading.Event()
+        self._open_buckets = {}  # (width, device) -> [bucket, count, mins, maxs, sums]
+
+        self._columns = ", ".join(f'"{name}"' for name in self.sensors)
+        self._rollup_columns = ", ".join(
+            f'"{name}_min", "{name}_max", "{name}_sum"' for name in self.sensors
+        )
+        placeholders = ", ".join("?" for _ in range(len(self.sensors) + 2))
+        self._insert = f"INSERT INTO readings (device, ts, {self._columns}) VALUES ({placeholders})"
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._create_readings(conn)
+            for width in ROLLUP_TIERS:
+                self._create_rollup(conn, width)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS alert_events (id INTEGER PRIMARY KEY, "
+                "device TEXT NOT NULL, sensor TEXT NOT NULL, state TEXT NOT NULL, "
+                "start REAL, end REAL, peak REAL, detectors TEXT, message TEXT)"
+            )
+            conn.commit()
+            last_id = conn.execute("SELECT MAX(id) FROM alert_events").fetchone()[0]
+        self._alert_ids = itertools.count((last_id or 0) + 1)
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _table_columns(self, conn, table):
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+    def _create_readings(self, conn):
+        columns = ", ".join(f'"{name}" REAL' for name in self.sensors)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS readings (device TEXT NOT NULL, ts REAL NOT NULL, {columns})"
+        )
+        existing = self._table_columns(conn, "readings")
+        for name in self.sensors:
+            if name not in existing:
+                # Sensor added to the schema; older rows read as NULL
+                conn.execute(f'ALTER TABLE readings ADD COLUMN "{name}" REAL')
+        conn.execute("CREATE INDEX IF NOT EXISTS readings_device_ts ON readings (device, ts)")
+
+    def append(self, device, timestamp, values):
+        # Never blocks the caller
+        try:
+            self._pending.put_nowait((device, timestamp, *values))
+        except queue.Full:
+            self.dropped += 1
+
+    def append_alert(self, device, event):
+        # Queue an alert transition (see AlertTracker) and return its id
+        entry = {"id": next(self._alert_ids), "device": device, **event}
+        self._pending_alerts.put(entry)
+        return entry
+
+    def _write_loop(self):
+        with closing(self._connect()) as conn:
+            while not (self._stop.is_set() and self._pending.empty()
+                       and self._pending_alerts.empty()):
+                try:
+                    batch = [self._pending.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    batch = []
+                # Give the batch a moment to fill before committing it
+                deadline = time.monotonic() + self.flush_interval
+                while batch and len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0 or self._stop.is_set():
+                        break
+                    try:
+                        batch.append(self._pending.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._pending.get_nowait())
+                    except queue.Empty:
+                        break
+
+                alerts = []
+                while not self._pending_alerts.empty():
+                    alerts.append(self._pending_alerts.get_nowait())
+                if not batch and not alerts:
+                    continue
+
+                by_device = {}
+                for row in batch:
+                    by_device.setdefault(row[0], []).append(row)
+                with conn:
+                    conn.executemany(self._insert, batch)
+                    conn.executemany(
+                        "INSERT INTO alert_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(entry["id"], entry["device"], entry["sensor"], entry["state"],
+                          entry["start"], entry["end"], entry["peak"],
+                          json.dumps(entry["detectors"]), entry.get("message"))
+                         for entry in alerts]
+                    )
+                    for width in ROLLUP_TIERS:
+                        for device, rows in by_device.items():
+                            self._roll_up(conn, width, device, rows)
+
+    def _create_rollup(self, conn, width):
+        table = f"rollup_{width}"
+        existing = self._table_columns(conn, table)
+        wanted = [f"{name}_{stat}" for name in self.sensors for stat in ("min", "max", "sum")]
+        if set(wanted) <= set(existing):
+            return
+        if existing:
+            # Rollups are derived data: rebuild tables from before a sensor
+            # was added
+            conn.execute(f"DROP TABLE {table}")
+        columns = ", ".join(
+            f'"{name}_min" REAL, "{name}_max" REAL, "{name}_sum" REAL' for name in self.sensors
+        )
+        conn.execute(
+            f"CREATE TABLE {table} (device TEXT NOT NULL, bucket REAL NOT NULL, "
+            f"n INTEGER NOT NULL, {columns}, PRIMARY KEY (device, bucket)) WITHOUT ROWID"
+        )
+        # Backfill from raw rows written before this tier existed
+        aggregates = ", ".join(
+            f'MIN("{name}"), MAX("{name}"), SUM("{name}")' for name in self.sensors
+        )
+        conn.execute(
+            f"INSERT INTO {table} (device, bucket, n, {self._rollup_columns}) "
+            f"SELECT device, CAST(ts / {width} AS INTEGER) * {width}, "
+            f"COUNT(*), {aggregates} FROM readings GROUP BY 1, 2"
+        )
+
+    def _load_bucket(self, conn, width, device, bucket):
+        # Resume a bucket that already has rows (e.g. after a restart)
+        n = len(self.sensors)
+        row = conn.execute(
+            f"SELECT n, {self._rollup_columns} FROM rollup_{width} WHERE device = ? AND bucket = ?",
+            (device, bucket)
+        ).fetchone()
+        if row is None:
+            return [bucket, 0, [float("inf")] * n, [float("-inf")] * n, [0.0] * n]
+        stats = row[1:]
+
+        # A sensor with no readings in the bucket yet has NULL stats
+        def column(values, default):
+            return [default if value is None else value for value in values]
+
+        return [bucket, row[0], column(stats[0::3], float("inf")),
+                column(stats[1::3], float("-inf")), column(stats[2::3], 0.0)]
+
+    def _roll_up(self, conn, width, device, batch):
+        current = self._open_buckets.get((width, device))
+        touched = []
+        for row in batch:
+            bucket = row[1] // width * width
+            if current is None or current[0] != bucket:
+                current = self._load_bucket(conn, width, device, bucket)
+            if not touched or touched[-1] is not current:
+                touched.append(current)
+            current[1] += 1
+            mins, maxs, sums = current[2], current[3], current[4]
+            for i, value in enumerate(row[2:]):
+                if value < mins[i]:
+                    mins[i] = value
+                if value > maxs[i]:
+                    maxs[i] = value
+                sums[i] += value
+        self._open_buckets[(width, device)] = current
+
+        # One upsert per bucket touched by this batch, not per reading
+        placeholders = ", ".join("?" for _ in range(3 + 3 * len(self.sensors)))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO rollup_{width} (device, bucket, n, {self._rollup_columns}) "
+            f"VALUES ({placeholders})",
+            [
+                (device, bucket, count,
+                 *[stat for triple in zip(mins, maxs, sums) for stat in triple])
+                for bucket, count, mins, maxs, sums in touched
+            ]
+        )
+
+    def close(self):
+        # Flush whatever is still queued
+        self._stop.set()
+        self._writer.join(timeout=10)
+
+    def iter_range(self, device, start, end=None, chunk_size=1000):
+        # Yield (timestamp, value, ...) rows of one device in [start, end) in
+        # time order. Each chunk of `chunk_size` rows is a separate index
+        # query on its own short connection, resuming after the last
+        # (ts, rowid) seen, so a slow consumer such as an /export download
+        # never keeps a read open between chunks (which would stop WAL
+        # checkpoints for its whole duration), and the chunks may be read
+        # from different threads.
+        if end is None:
+            end = float("inf")
+        after = (start, -1)
+        while True:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    f"SELECT ts, rowid, {self._columns} FROM readings "
+                    "WHERE device = ? AND ts >= ? AND (ts, rowid) > (?, ?) AND ts < ? "
+                    "ORDER BY ts, rowid LIMIT ?",
+                    (device, after[0], after[0], after[1], end, chunk_size)
+                ).fetchall()
+            if not rows:
+                break
+            after = rows[-1][:2]
+            for row in rows:
+                yield (row[0],) + row[2:]
+
+    def query(self, device, start, end=None):
+        # Readings in [start, end) shaped like the in-memory history entries
+        return [
+            {"timestamp": row[0], **dict(zip(self.sensors, row[1:]))}
+            for row in self.iter_range(device, start, end)
+        ]
+
+    def rollups(self, device, width, start, end=None):
+        # Buckets of one ROLLUP_TIERS width overlapping [start, end), as
+        # {"timestamp", "count", sensor: {"min", "max", "mean"}}
+        if end is None:
+            end = float("inf")
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT bucket, n, {self._rollup_columns} FROM rollup_{width} "
+                "WHERE device = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+                (device, start // width * width, end)
+            ).fetchall()
+        result = []
+        for row in rows:
+            count, stats = row[1], row[2:]
+            entry = {"timestamp": row[0], "count": count}
+            for i, name in enumerate(self.sensors):
+                low, high, total = stats[3 * i:3 * i + 3]
+                mean = None if total is None else total / count
+                entry[name] = {"min": low, "max": high, "mean": mean}
+            result.append(entry)
+        return result
+
+    def alert_events(self, device, since=0, limit=500):
+        # Logged alert transitions of one device with id > `since`, oldest first
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, device, sensor, state, start, end, peak, message, detectors "
+                "FROM alert_events WHERE device = ? AND id > ? ORDER BY id LIMIT ?",
+                (device, since, limit)
+            ).fetchall()
+        keys = ("id", "device", "sensor", "state", "start", "end", "peak", "message")
+        return [{**dict(zip(keys, row)), "detectors": json.loads(row[8])} for row in rows]
+
+    def _count(self, device, start, end, limit):
+        # Raw rows of one device in [start, end), counting no further than `limit`
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM readings "
+                "WHERE device = ? AND ts >= ? AND ts < ? LIMIT ?)",
+                (device, start, float("inf") if end is None else end, limit)
+            ).fetchone()[0]
+
+    def history(self, device, start, end=None, resolution="auto", max_points=1500):
+        # Range query that picks the finest tier returning at most
+        # `max_points` points: raw rows when the range holds no more than
+        # that (counted, since the sample rate varies by board), otherwise
+        # the finest rollup with few enough buckets. A forced resolution
+        # gets the same limit, ValueError past it (/export has no limit).
+        # Returns (resolution name, points).
+        span = (end if end is not None else time.time()) - start
+        widths = {name: width for width, name in ROLLUP_TIERS.items()}
+        if resolution == "auto":
+            resolution = "raw"
+            if self._count(device, start, end, max_points + 1) > max_points:
+                # Falls through to the coarsest tier for very long ranges
+                for width, name in sorted(ROLLUP_TIERS.items()):
+                    resolution = name
+                    if span <= max_points * width:
+                        break
+        elif resolution == "raw":
+            if self._count(device, start, end, max_points + 1) > max_points:
+                raise ValueError(f"more than {max_points} raw readings in range, "
+                                 "use a coarser resolution or /export")
+        elif resolution not in widths:
+            raise ValueError(f"unknown resolution {resolution!r}")
+        elif span > max_points * widths[resolution]:
+            raise ValueError(f"more than {max_points} {resolution} buckets in range, "
+                             "use a coarser resolution or /export")
+        if resolution == "raw":
+            return resolution, self.query(device, start, end)
+        return resolution, self.rollups(device, widths[resolution], start, end)
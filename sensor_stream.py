@@ -0,0 +1,83 @@
+import json
+import queue
+import threading
+
+
+def format_event(event, payload):
+    # Server-Sent Events wire format, encoded once and shared by every client
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return format_raw_event(event, data)
+
+
+def format_raw_event(event, data):
+    # Same, for a payload that is already serialized JSON bytes
+    return b"event: " + event.encode('ascii') + b"\ndata: " + data + b"\n\n"
+
+
+class EventStream:
+    # Fans out sensor updates to every open /stream connection. Each client
+    # gets a small bounded queue so a stalled browser can never hold back
+    # the serial loop; when it falls behind, its oldest events are dropped.
+    def __init__(self, backlog=16, keepalive=15):
+        self.backlog = backlog
+        self.keepalive = keepalive
+        self._clients = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def client_count(self):
+        with self._lock:
+            return len(self._clients)
+
+    def add_listener(self, callback):
+        # Also call `callback(event, payload, data)` for every event, `data`
+        # being the payload serialized once as JSON bytes. Runs on the
+        # publishing thread, so it must not block.
+        with self._lock:
+            self._listeners.append(callback)
+
+    def publish(self, event, payload):
+        with self._lock:
+            clients = list(self._clients)
+            listeners = list(self._listeners)
+        if not clients and not listeners:
+            return
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        for callback in listeners:
+            callback(event, payload, data)
+        message = format_raw_event(event, data)
+        for q in clients:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    q.put_nowait(message)
+                except queue.Full:
+                    pass
+
+    def listen(self, initial=None):
+        # Generator for a streaming Flask response. `initial` is an
+        # (event, payload) pair, or an already formatted event, sent first so
+        # new clients don't wait a tick.
+        q = queue.Queue(maxsize=self.backlog)
+        with self._lock:
+            self._clients.add(q)
+        try:
+            yield b"retry: 3000\n\n"
+            if isinstance(initial, bytes):
+                yield initial
+            elif initial is not None:
+                yield format_event(*initial)
+            while True:
+                try:
+                    yield q.get(timeout=self.keepalive)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield b": keepalive\n\n"
+        finally:
+            with self._lock:
+                self._clients.discard(q)
@@ -0,0 +1,11 @@
+import app as clinical
+import Userapp as user
+from sensor_api import create_app
+
+# Both dashboards on one sensor pipeline: the clinical view at /, the user
+# view at /user/, and the shared /data, /stream, ... API underneath.
+# For many concurrent dashboards serve asgi.py instead.
+app = create_app((clinical.view, "/"), (user.view, "/user"))
+
+if __name__ == "__main__":
+    app.run(debug=False, host="0.0.0.0", port=5000)
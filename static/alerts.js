@@ -0,0 +1,60 @@
+// Shared by the dashboards (loaded before app.js and user.js): the board a
+// page shows, its API URLs, the ongoing alerts and the socket stride
+
+// Board shown by this page, e.g. /?device=room2 (first board if unset)
+const device = new URLSearchParams(location.search).get('device');
+
+function apiUrl(path, params = {}) {
+    const query = new URLSearchParams(params);
+    if (device) query.set('device', device);
+    const text = query.toString();
+    return text ? `${path}?${text}` : path;
+}
+
+// Patch an alert list in place: drop ended alerts, append new ones
+function patchAlertList(container, alerts, render) {
+    const wanted = new Map(alerts.map(alert => [String(alert.id), alert]));
+    for (const element of [...container.children]) {
+        if (!wanted.delete(element.dataset.id)) element.remove();
+    }
+    for (const [id, alert] of wanted) {
+        const element = render(alert);
+        element.dataset.id = id;
+        container.appendChild(element);
+    }
+}
+
+// Ongoing alerts by sensor, as logged by the server (see /alerts)
+let activeAlerts = {};
+
+// Set by each page; only runs when an alert starts or ends
+let onAlertsChanged = () => {};
+
+function setActiveAlerts(alerts) {
+    const ids = alerts => Object.values(alerts).map(alert => alert.id).sort().join();
+    if (ids(alerts) === ids(activeAlerts)) return;
+    activeAlerts = alerts;
+    onAlertsChanged();
+}
+
+// Apply one alert start/end transition
+function applyAlertEvent(event) {
+    const alerts = { ...activeAlerts };
+    if (event.state === 'active') {
+        alerts[event.sensor] = event;
+    } else {
+        delete alerts[event.sensor];
+    }
+    setActiveAlerts(alerts);
+}
+
+// Stride keeping the board's reading rate, measured over a snapshot's
+// history, under `maxPerSecond`: the socket then forwards one reading in
+// `stride` (see the subscribe command). `fallback` when the history is
+// too short to tell.
+function strideFor(history, maxPerSecond, fallback = 1) {
+    if (!history || history.length < 2) return fallback;
+    const span = history[history.length - 1].timestamp - history[0].timestamp;
+    if (span <= 0) return fallback;
+    return Math.max(1, Math.ceil((history.length - 1) / span / maxPerSecond));
+}
@@ -0,0 +1,604 @@
+let monitoringActive = true;
+let sensorChart;
+let lastSeq = 0;  // Newest reading seq already rendered
+
+const HISTORY_LENGTH = 20;  // Until /sensors gives the server's
+
+// Sensor definitions from /sensors, in the order the board sends them
+let sensors = [];
+
+function sensorId(name) {
+    return name.toLowerCase().replace(/[^a-z0-9]/g, '');
+}
+
+// Card elements by sensor name, built once and then patched in place
+const cardElements = {};
+
+function buildCards() {
+    document.getElementById('sensor-cards').innerHTML = sensors.map(sensor => {
+        const id = sensorId(sensor.name);
+        return `
+        <div class="sensor-card" id="sensor-${id}">
+            <div class="sensor-title">${sensor.name}</div>
+            <div class="sensor-value" id="value-${id}">0.000</div>
+            <div class="sensor-baseline" id="baseline-${id}">Baseline: 0.000</div>
+        </div>`;
+    }).join('');
+    sensors.forEach(sensor => {
+        const id = sensorId(sensor.name);
+        cardElements[sensor.name] = {
+            card: document.getElementById(`sensor-${id}`),
+            value: document.getElementById(`value-${id}`),
+            baseline: document.getElementById(`baseline-${id}`)
+        };
+    });
+}
+
+// Only touch the DOM when the text actually changes
+function setText(element, text) {
+    if (element.textContent !== text) element.textContent = text;
+}
+
+// Points per sensor as {x: time in ms, y: value}, shared with the chart.
+// The chart shows the newest `chartWindow` of them (the server's history
+// length, from /sensors, over the socket's stride); older ones are dropped
+// in chunks, so appending stays O(1) amortized however long the window.
+let historyLength = HISTORY_LENGTH;
+let chartWindow = HISTORY_LENGTH;
+let chartSeries = [];
+let pointCount = 0;  // Points ever appended, to index the extremes
+
+// Min and max of the values in the window, kept with monotonic queues so
+// an update never rescans every point
+class SlidingExtremes {
+    constructor() {
+        this.reset();
+    }
+
+    reset() {
+        this.low = [];
+        this.high = [];
+        this.lowStart = 0;
+        this.highStart = 0;
+    }
+
+    push(index, value) {
+        while (this.low.length > this.lowStart && this.low[this.low.length - 1].value >= value) {
+            this.low.pop();
+        }
+        while (this.high.length > this.highStart && this.high[this.high.length - 1].value <= value) {
+            this.high.pop();
+        }
+        this.low.push({ index, value });
+        this.high.push({ index, value });
+    }
+
+    // Forget values appended before point `first`
+    evict(first) {
+        while (this.lowStart < this.low.length && this.low[this.lowStart].index < first) this.lowStart++;
+        while (this.highStart < this.high.length && this.high[this.highStart].index < first) this.highStart++;
+        if (this.lowStart > 1024) {
+            this.low = this.low.slice(this.lowStart);
+            this.lowStart = 0;
+        }
+        if (this.highStart > 1024) {
+            this.high = this.high.slice(this.highStart);
+            this.highStart = 0;
+        }
+    }
+
+    get min() {
+        return this.lowStart < this.low.length ? this.low[this.lowStart].value : null;
+    }
+
+    get max() {
+        return this.highStart < this.high.length ? this.high[this.highStart].value : null;
+    }
+}
+
+const extremes = new SlidingExtremes();
+
+function chartColors() {
+    const isDark = document.body.classList.contains('dark');
+    return { grid: isDark ? '#444' : '#ddd', text: isDark ? '#fff' : '#333' };
+}
+
+function initChart() {
+    if (!window.Chart) return;  // Chart.js failed to load: cards still update
+    chartSeries = sensors.map(() => []);
+    extremes.reset();
+    const ctx = document.getElementById('sensorChart').getContext('2d');
+    const colors = chartColors();
+
+    sensorChart = new Chart(ctx, {
+        type: 'line',
+        data: {
+            datasets: sensors.map((sensor, index) => ({
+                label: sensor.name,
+                data: chartSeries[index],
+                borderColor: sensor.color,
+                backgroundColor: sensor.color + '1a',  // 10% opacity
+                borderWidth: 2,
+                // Dots only help while there are few enough to see
+                pointRadius: chartWindow > 200 ? 0 : 3,
+                fill: false,
+                tension: chartWindow > 200 ? 0 : 0.1
+            }))
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            // Points are appended many times a second: no animation, and
+            // data already in Chart.js's internal format, sorted by x
+            animation: false,
+            parsing: false,
+            normalized: true,
+            spanGaps: true,
+            layout: {
+                padding: {
+                    top: 20,
+                    right: 20,
+                    bottom: 20,
+                    left: 20
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: false,
+                    grid: {
+                        color: colors.grid
+                    },
+                    ticks: {
+                        color: colors.text,
+                        maxTicksLimit: 8,
+                        callback: function(value) {
+                            return value.toFixed(3);
+                        }
+                    }
+                },
+                x: {
+                    type: 'linear',
+                    grid: {
+                        color: colors.grid
+                    },
+                    ticks: {
+                        color: colors.text,
+                        maxTicksLimit: 10,
+                        callback: function(value) {
+                            return new Date(value).toLocaleTimeString();
+                        }
+                    }
+                }
+            },
+            plugins: {
+                legend: {
+                    labels: {
+                        color: colors.text
+                    }
+                },
+                // Long windows are drawn from the min and max of each pixel
+                // column, which keeps every spike visible
+                decimation: {
+                    enabled: true,
+                    algorithm: 'min-max'
+                }
+            }
+        }
+    });
+}
+
+// Append new readings to the chart instead of rebuilding it
+function appendChart(points, reset) {
+    if (!sensorChart) return;
+
+    if (reset) {
+        chartSeries.forEach(series => series.length = 0);
+        extremes.reset();
+    }
+    if (points.length === 0 && !reset) return;
+
+    for (const item of points) {
+        const x = item.timestamp * 1000;
+        sensors.forEach((sensor, index) => {
+            const y = item[sensor.name] ?? null;
+            chartSeries[index].push({ x, y });
+            if (y !== null) extremes.push(pointCount, y);
+        });
+        pointCount++;
+    }
+
+    // Points past the window stay hidden left of the x axis until there
+    // are enough of them to drop at once
+    const excess = (chartSeries[0] || []).length - chartWindow;
+    if (excess > 0) {
+        extremes.evict(pointCount - chartWindow);
+        if (excess >= Math.max(16, chartWindow / 10)) {
+            chartSeries.forEach(series => series.splice(0, excess));
+        }
+    }
+    scheduleChartUpdate();
+}
+
+// Redraw at most once per animation frame however many readings arrive
+// (and not at all while the tab is hidden)
+let chartUpdatePending = false;
+
+function scheduleChartUpdate() {
+    if (chartUpdatePending) return;
+    chartUpdatePending = true;
+    requestAnimationFrame(() => {
+        chartUpdatePending = false;
+        redrawChart();
+    });
+}
+
+function redrawChart() {
+    if (!sensorChart) return;
+    const points = chartSeries[0] || [];
+    const scales = sensorChart.options.scales;
+    if (points.length > 0) {
+        scales.x.min = points[Math.max(0, points.length - chartWindow)].x;
+        scales.x.max = points[points.length - 1].x;
+    }
+
+    // Y-axis range from the window's extremes, with 10% padding
+    const minVal = extremes.min;
+    const maxVal = extremes.max;
+    if (minVal !== null) {
+        const padding = (maxVal - minVal) * 0.1 || Math.abs(maxVal) * 0.1 || 0.001;
+        scales.y.min = Math.max(0, minVal - padding);
+        scales.y.max = maxVal + padding;
+    }
+
+    // Decimation swaps in its own arrays while drawing; hand back ours
+    sensorChart.data.datasets.forEach((dataset, index) => dataset.data = chartSeries[index]);
+    sensorChart.update('none');
+}
+
+function toggleTheme() {
+    const body = document.body;
+    const themeBtn = document.querySelector('.theme-btn');
+
+    if (body.classList.contains('dark')) {
+        body.classList.remove('dark');
+        body.classList.add('light');
+        themeBtn.textContent = 'Light mode';
+    } else {
+        body.classList.remove('light');
+        body.classList.add('dark');
+        themeBtn.textContent = 'Dark mode';
+    }
+
+    // Recolour the chart in place; its data stays as it is
+    if (sensorChart) {
+        const colors = chartColors();
+        const scales = sensorChart.options.scales;
+        scales.x.grid.color = scales.y.grid.color = colors.grid;
+        scales.x.ticks.color = scales.y.ticks.color = colors.text;
+        sensorChart.options.plugins.legend.labels.color = colors.text;
+        sensorChart.update('none');
+    }
+}
+
+function sendMessage() {
+    const input = document.getElementById('ai-input');
+    const chat = document.getElementById('ai-chat');
+
+    if (input.value.trim()) {
+        const message = document.createElement('div');
+        message.style.marginBottom = '10px';
+        message.style.padding = '8px 12px';
+        message.style.borderRadius = '15px';
+        message.style.background = document.body.classList.contains('dark') ? '#4a4a4a' : '#e3f2fd';
+        message.textContent = '👤 ' + input.value;
+
+        chat.appendChild(message);
+
+        // Simple AI response
+        setTimeout(() => {
+            const response = document.createElement('div');
+            response.style.marginBottom = '10px';
+            response.style.padding = '8px 12px';
+            response.style.borderRadius = '15px';
+            response.style.background = document.body.classList.contains('dark') ? '#2a4a2a' : '#e8f5e8';
+            response.textContent = '🤖 Based on your sensor data, I recommend monitoring the detected gas levels and ensuring proper ventilation.';
+
+            chat.appendChild(response);
+            chat.scrollTop = chat.scrollHeight;
+        }, 1000);
+
+        input.value = '';
+        chat.scrollTop = chat.scrollHeight;
+    }
+}
+
+function startMonitoring() {
+    monitoringActive = true;
+    // Over the socket the server resumes with a fresh snapshot
+    if (socket) sendCommand({ type: 'resume' });
+    console.log('Monitoring started');
+}
+
+function stopMonitoring() {
+    monitoringActive = false;
+    if (socket) sendCommand({ type: 'pause' });
+    console.log('Monitoring stopped');
+}
+
+function resetBaseline() {
+    if (socket) {
+        sendCommand({ type: 'reset_baseline' });
+        return;
+    }
+    fetch(apiUrl('/reset_baseline'), { method: 'POST' })
+        .then(response => response.json())
+        .then(data => {
+            console.log('Baseline recalibration started:', data.job);
+            // Stream clients get a 'baseline' event when it finishes
+            if (!streamOpen) watchBaselineJob(data.job.id);
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+function watchBaselineJob(id) {
+    fetch(apiUrl('/reset_baseline/status'))
+        .then(response => response.json())
+        .then(job => {
+            if (job.id !== id || job.state === 'done') {
+                console.log('Baseline reset:', job);
+            } else {
+                setTimeout(() => watchBaselineJob(id), 1000);
+            }
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+function refreshData() {
+    // Reset the graph by clearing history and fetching fresh data
+    if (socket) {
+        sendCommand({ type: 'clear_history' });  // 'cleared' event empties the chart
+        return;
+    }
+    fetch(apiUrl('/clear_history'), { method: 'POST' })
+        .then(response => response.json())
+        .then(data => {
+            console.log('History cleared:', data);
+            appendChart([], true);
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+// Render a /data-shaped payload: sensor cards, chart and alerts
+function renderData(data) {
+    if (!monitoringActive) return;
+
+    // Update sensor cards
+    sensors.forEach((sensor, index) => {
+        const elements = cardElements[sensor.name];
+        if (elements) {
+            const value = data.readings[sensor.name] || 0;
+            const baseline = data.baseline[index] || 0;
+
+            setText(elements.value, value.toFixed(3));
+            setText(elements.baseline, `Baseline: ${baseline.toFixed(3)}`);
+        }
+    });
+
+    // Update chart with the new part of the history. The seq moves on even
+    // without a chart (Chart.js failed to load), or every reading would
+    // look like a gap and fetch the whole history again.
+    if (data.history) {
+        appendChart(data.history, data.reset);
+    }
+    lastSeq = data.seq;
+
+    // Full states (snapshot, /data) carry the ongoing alerts; readings
+    // don't, alert changes arrive as 'alert' events
+    if (data.active_alerts) {
+        setActiveAlerts(data.active_alerts);
+    }
+}
+
+// Only runs when an alert starts or ends
+onAlertsChanged = () => {
+    sensors.forEach(sensor => {
+        const elements = cardElements[sensor.name];
+        const isAlert = sensor.name in activeAlerts;
+        if (elements) {
+            elements.card.classList.toggle('alert', isAlert);
+            elements.value.classList.toggle('alert', isAlert);
+        }
+    });
+    patchAlertList(document.getElementById('alerts'), Object.values(activeAlerts), alert => {
+        const element = document.createElement('div');
+        element.className = 'alert-item';
+        element.textContent = `🚨 ${alert.message}`;
+        return element;
+    });
+};
+
+// Polling fallback, only used while the stream is unavailable
+async function updateData() {
+    if (!monitoringActive) return;
+
+    try {
+        const response = await fetch(apiUrl('/data', { since: lastSeq }));
+        renderData(await response.json());
+    } catch (e) {
+        console.error("Error fetching data:", e);
+    }
+}
+
+let pollTimer = null;
+let streamOpen = false;
+
+function startPolling() {
+    if (pollTimer) return;
+    pollTimer = setInterval(updateData, 1000);
+    updateData();
+}
+
+function stopPolling() {
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+// Handlers for pushed events, shared by the WebSocket and the stream
+const eventHandlers = {
+    snapshot: data => {
+        stopPolling();
+        if (socket) {
+            if (!strideChosen) {
+                // Once per connection, from its first snapshot
+                strideChosen = true;
+                const wanted = strideFor(data.history, MAX_READINGS_PER_SECOND, stride);
+                if (wanted !== stride) {
+                    setStride(wanted);
+                    subscribe();  // Answered with a new snapshot
+                }
+            }
+            data.history = decimate(data.history);
+        }
+        renderData(data);
+    },
+    reading: data => {
+        const seq = data.sample.seq;
+        if (seq <= lastSeq) return;  // Already in the snapshot
+        if (seq > lastSeq + stride) {
+            // Missed events: catch up
+            if (socket) sendCommand({ type: 'refresh' });
+            else updateData();
+            return;
+        }
+        data.history = [data.sample];
+        renderData(data);
+    },
+    cleared: () => appendChart([], true),
+    alert: applyAlertEvent,
+    baseline: job => {
+        if (job.state === 'done') console.log('Baseline reset:', job);
+    }
+};
+
+// Server pushes a snapshot on connect, then one event per new reading
+function connectStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    const source = new EventSource(apiUrl('/stream'));
+    source.onopen = () => {
+        streamOpen = true;
+        stopPolling();
+    };
+    // EventSource reconnects on its own; poll until it does
+    source.onerror = () => {
+        streamOpen = false;
+        startPolling();
+    };
+    for (const [name, handler] of Object.entries(eventHandlers)) {
+        source.addEventListener(name, e => handler(JSON.parse(e.data)));
+    }
+}
+
+let socket = null;  // Open WebSocket, if the server has one
+
+function sendCommand(command) {
+    socket.send(JSON.stringify(command));
+}
+
+// Readings per second the page draws at most. Faster boards are decimated
+// by the server: the socket forwards one reading in `stride` (see the
+// subscribe command), so consecutive readings' seqs are `stride` apart.
+const MAX_READINGS_PER_SECOND = 20;
+let stride = 1;
+let strideChosen = false;
+
+function subscribe() {
+    sendCommand({ type: 'subscribe', devices: device ? [device] : null, every: stride });
+}
+
+function setStride(value) {
+    // The chart keeps covering the server's history time span
+    stride = value;
+    chartWindow = Math.ceil(historyLength / stride);
+}
+
+// Every `stride`-th reading of a history, ending with the newest
+function decimate(history) {
+    if (stride === 1 || !history || history.length === 0) return history;
+    const last = history[history.length - 1].seq;
+    return history.filter(item => (last - item.seq) % stride === 0);
+}
+
+// Preferred channel: one WebSocket carries the updates and the control
+// buttons' commands. Servers without /ws get the SSE stream instead.
+function connectSocket() {
+    if (!window.WebSocket) {
+        connectStream();
+        return;
+    }
+    const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+    const ws = new WebSocket(`${scheme}://${location.host}/ws`);
+    let opened = false;
+    ws.onopen = () => {
+        opened = true;
+        socket = ws;
+        streamOpen = true;
+        strideChosen = false;
+        stopPolling();
+        subscribe();
+        if (!monitoringActive) sendCommand({ type: 'pause' });
+    };
+    ws.onmessage = e => {
+        const message = JSON.parse(e.data);
+        if (message.event === 'ack') {
+            if (message.data.command === 'reset_baseline') {
+                console.log('Baseline recalibration started:', message.data.result);
+            }
+        } else if (message.event === 'error') {
+            console.error('Error:', message.data.message);
+        } else if (eventHandlers[message.event]) {
+            eventHandlers[message.event](message.data);
+        }
+    };
+    ws.onclose = () => {
+        socket = null;
+        streamOpen = false;
+        setStride(1);  // Polling and the stream get every reading
+        if (opened) {
+            // Lost a working socket: poll while reconnecting
+            startPolling();
+            setTimeout(connectSocket, 3000);
+        } else {
+            connectStream();
+        }
+    };
+}
+
+// Allow Enter key to send message
+document.getElementById('ai-input').addEventListener('keypress', function(e) {
+    if (e.key === 'Enter') {
+        sendMessage();
+    }
+});
+
+// Build the cards and chart from the sensor list, then subscribe to
+// live updates
+fetch('/sensors')
+    .then(response => response.json())
+    .then(data => {
+        sensors = data.sensors;
+        historyLength = chartWindow = data.history_length || HISTORY_LENGTH;
+        buildCards();
+        initChart();
+        connectSocket();
+    })
+    .catch(error => console.error('Error loading sensors:', error));
+
+// Cache the page and its static files so repeat visits load without the
+// network (see /sw.js)
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.register('/sw.js')
+        .catch(error => console.error('Service worker:', error));
+}
@@ -0,0 +1,194 @@
+function toggleMenu() {
+    const menu = document.getElementById('nav-menu');
+    menu.classList.toggle('active');
+}
+document.querySelectorAll('nav ul a').forEach(link => {
+    link.addEventListener('click', () => {
+        document.getElementById('nav-menu').classList.remove('active');
+    });
+});
+document.addEventListener('click', (e) => {
+    const nav = document.querySelector('nav');
+    const menu = document.getElementById('nav-menu');
+    const toggle = document.querySelector('.menu-toggle');
+    if (!nav.contains(e.target) && menu.classList.contains('active')) {
+        menu.classList.remove('active');
+    }
+});
+
+// Result cards, one per sensor in /sensors
+let cards = [];
+
+// Creates the cards once; renderData() and renderCards() then only patch
+// the value text and the risk classes, so images are never reloaded
+function buildCards() {
+    document.getElementById('result-cards').innerHTML = cards.map(card => `
+        <div class="result-card success" id="card-${card.id}">
+            <div>
+                ${card.img ? `<img src="${card.img}">` : ""}
+            </div>
+            <div class="result-detail">
+                <h2>${card.disease}</h2>
+                <div class="result-tag">
+                    <p>ผลตรวจ :</p>
+                    <div class="tag tag-success" id="tag-${card.id}">ไม่มีความเสี่ยง</div>
+                </div>
+                <p>ค่า : <span id="value-${card.id}">-</span></p>
+            </div>
+        </div>
+    `).join('');
+    for (const card of cards) {
+        card.element = document.getElementById(`card-${card.id}`);
+        card.tag = document.getElementById(`tag-${card.id}`);
+        card.value = document.getElementById(`value-${card.id}`);
+        card.danger = false;
+    }
+}
+
+// Dynamic update for sensor readings and alerts
+function renderData(data) {
+    // Full states (snapshot, /data) carry the ongoing alerts; readings
+    // don't, alert changes arrive as 'alert' events
+    if (data.active_alerts) {
+        setActiveAlerts(data.active_alerts);
+    }
+    for (const card of cards) {
+        const value = data.readings[card.sensor];
+        const text = value === undefined ? '-' : value.toFixed(3);
+        if (card.value.textContent !== text) card.value.textContent = text;
+    }
+}
+
+// Risk state of each card; only runs when an alert starts or ends
+function renderCards() {
+    for (const card of cards) {
+        const danger = card.sensor in activeAlerts;
+        if (danger === card.danger) continue;
+        card.danger = danger;
+        card.element.classList.toggle('danger', danger);
+        card.element.classList.toggle('success', !danger);
+        card.tag.classList.toggle('tag-danger', danger);
+        card.tag.classList.toggle('tag-success', !danger);
+        card.tag.textContent = danger ? "มีความเสี่ยง" : "ไม่มีความเสี่ยง";
+    }
+}
+
+// The cards' risk state and the alert list only change when an alert
+// starts or ends
+onAlertsChanged = () => {
+    renderCards();
+    patchAlertList(document.getElementById('alerts'), Object.values(activeAlerts), alert => {
+        const element = document.createElement('div');
+        element.className = 'alert';
+        element.textContent = alert.message;
+        return element;
+    });
+};
+
+// Polling fallback, only used while the stream is unavailable
+async function updateData() {
+    try {
+        const response = await fetch(apiUrl('/data'));
+        renderData(await response.json());
+    } catch (e) {
+        console.error("Error fetching data:", e);
+    }
+}
+
+let pollTimer = null;
+
+function startPolling() {
+    if (pollTimer) return;
+    pollTimer = setInterval(updateData, 1000);
+    updateData();
+}
+
+function stopPolling() {
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+// Server pushes a snapshot on connect, then one event per new reading
+function connectStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    const source = new EventSource(apiUrl('/stream'));
+    source.onopen = stopPolling;
+    // EventSource reconnects on its own; poll until it does
+    source.onerror = startPolling;
+    const onData = e => {
+        stopPolling();
+        renderData(JSON.parse(e.data));
+    };
+    source.addEventListener('snapshot', onData);
+    source.addEventListener('reading', onData);
+    source.addEventListener('alert', e => applyAlertEvent(JSON.parse(e.data)));
+}
+
+// The cards only need a couple of updates a second: over the socket a
+// faster board is decimated by the server to one reading in `every`, worked
+// out from the reading rate of the first snapshot's history
+const MAX_READINGS_PER_SECOND = 2;
+
+// WebSocket first; servers without /ws get the stream instead
+function connectSocket() {
+    if (!window.WebSocket) {
+        connectStream();
+        return;
+    }
+    const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+    const ws = new WebSocket(`${scheme}://${location.host}/ws`);
+    let opened = false;
+    let every = null;  // Until the first snapshot
+    const subscribe = () => ws.send(JSON.stringify({
+        type: 'subscribe', devices: device ? [device] : null, every: every || 1
+    }));
+    ws.onopen = () => {
+        opened = true;
+        stopPolling();
+        subscribe();
+    };
+    ws.onmessage = e => {
+        const message = JSON.parse(e.data);
+        if (message.event === 'snapshot' && every === null) {
+            every = strideFor(message.data.history, MAX_READINGS_PER_SECOND);
+            if (every > 1) subscribe();
+        }
+        if (message.event === 'snapshot' || message.event === 'reading') {
+            renderData(message.data);
+        } else if (message.event === 'alert') {
+            applyAlertEvent(message.data);
+        }
+    };
+    ws.onclose = () => {
+        if (opened) {
+            startPolling();
+            setTimeout(connectSocket, 3000);
+        } else {
+            connectStream();
+        }
+    };
+}
+
+fetch('/sensors')
+    .then(response => response.json())
+    .then(data => {
+        cards = data.sensors.map(sensor => ({
+            id: sensor.name.toLowerCase().replace(/[^a-z0-9]/g, ''),
+            disease: sensor.label,
+            img: sensor.image,
+            sensor: sensor.name
+        }));
+        buildCards();
+        connectSocket();
+    })
+    .catch(error => console.error('Error loading sensors:', error));
+
+// Cache the page and its static files so repeat visits load without the
+// network (see /sw.js)
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.register('/sw.js')
+        .catch(error => console.error('Service worker:', error));
+}
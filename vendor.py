@@ -0,0 +1,64 @@
+import os
+import re
+import sys
+import urllib.parse
+import urllib.request
+
+from assets import STATIC_DIR, VENDORED
+
+# Downloads the third-party files in assets.VENDORED (Chart.js, the Prompt
+# font, the dashboard pictures) into static/ so the dashboards load with
+# no internet access. Run once with internet, then commit static/vendor:
+#
+#   python vendor.py           # fetch what's missing
+#   python vendor.py --force   # fetch everything again
+#
+# Stylesheets (Google Fonts) are fetched with their font files, which are
+# saved next to them and referenced by relative URL.
+
+# Google Fonts only sends woff2 with unicode-range subsets to modern browsers
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/120.0 Safari/537.36")
+
+
+def fetch(url):
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def vendor_stylesheet(path, url):
+    # Saves a stylesheet with every url(...) it names downloaded beside it
+    css = fetch(url).decode('utf-8')
+    folder = os.path.dirname(path)
+
+    def localize(match):
+        source = urllib.parse.urljoin(url, match.group(2))
+        name = os.path.basename(urllib.parse.urlparse(source).path)
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(fetch(source))
+        return f"url({name})"
+
+    css = re.sub(r"url\((['\"]?)(.*?)\1\)", localize, css)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(css)
+
+
+def main():
+    force = "--force" in sys.argv[1:]
+    for name, url in VENDORED.items():
+        path = os.path.join(STATIC_DIR, *name.split("/"))
+        if os.path.exists(path) and not force:
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        print(f"{name} <- {url}")
+        if name.endswith(".css"):
+            vendor_stylesheet(path, url)
+        else:
+            body = fetch(url)
+            with open(path, 'wb') as f:
+                f.write(body)
+
+
+if __name__ == "__main__":
+    main()